@@ -1,13 +1,13 @@
 from typing import AsyncGenerator
 from fastapi import Depends
-from supabase import Client
-from app.database import get_database, supabase_client
+from supabase import AsyncClient
+from app.database import SupabaseClient, get_database, supabase_client
 
-async def get_db() -> AsyncGenerator[Client, None]:
+async def get_db() -> AsyncGenerator[SupabaseClient, None]:
     """Async dependency to get database client"""
     async for db in get_database():
         yield db
 
-def get_db_sync() -> Client:
+def get_db_sync() -> AsyncClient:
     """Synchronous dependency to get database client"""
     return supabase_client.client
\ No newline at end of file
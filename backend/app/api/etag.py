@@ -0,0 +1,96 @@
+import hashlib
+from typing import Iterable, Optional
+from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
+
+
+# ETags are weak: GZipMiddleware may compress a response after it was tagged,
+# and a weak validator stays valid across content encodings
+def compute_etag(*parts: object) -> str:
+    """Build a weak ETag from the given values"""
+    digest = hashlib.blake2b(":".join(str(part) for part in parts).encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def if_none_match_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against the ETag using weak comparison"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(","))
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the If-None-Match header of the request matches the ETag"""
+    return if_none_match_matches(request.headers.get("If-None-Match"), etag)
+
+
+def compute_content_etag(*chunks: bytes) -> str:
+    """Build a weak ETag from the serialized response body"""
+    digest = hashlib.blake2b(digest_size=8)
+    for chunk in chunks:
+        digest.update(chunk)
+    return f'W/"{digest.hexdigest()}"'
+
+
+class ETagMiddleware:
+    """
+    Add content ETags to GET responses of the given paths.
+    
+    Successful JSON responses that don't set an ETag themselves are buffered,
+    tagged with a hash of the body and answered with 304 when the client's
+    If-None-Match matches. Responses with their own ETag pass through as-is.
+    """
+    
+    def __init__(self, app, paths: Iterable[str]):
+        self.app = app
+        self.paths = frozenset(paths)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        
+        start_message = None
+        body_chunks: list[bytes] = []
+        passthrough = False
+        
+        async def buffered_send(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if (
+                    message["status"] != 200
+                    or "etag" in headers
+                    or not headers.get("content-type", "").startswith("application/json")
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+            body_chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            
+            etag = compute_content_etag(*body_chunks)
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers["ETag"] = etag
+            headers.setdefault("Cache-Control", "private, max-age=0, must-revalidate")
+            if if_none_match_matches(Headers(scope=scope).get("if-none-match"), etag):
+                # Other headers (CORS, Vary) are kept; the body headers are dropped
+                del headers["content-length"]
+                del headers["content-type"]
+                await send({**start_message, "status": 304})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            
+            await send(start_message)
+            await send({"type": "http.response.body", "body": b"".join(body_chunks)})
+        
+        await self.app(scope, receive, buffered_send)
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import Depends
+from app.database import SupabaseClient, get_database
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BatchLoader:
+    """
+    Coalesces single-row lookups by id into one query.
+    
+    All load() calls made during the same event loop iteration, including
+    those from concurrent requests, are answered by a single
+    `select(...).in_('id', ids)` request. Results are not cached, so every
+    batch reads current data.
+    """
+    
+    def __init__(
+        self,
+        db: SupabaseClient,
+        table: str,
+        columns: str = '*',
+        max_batch_size: int = 100
+    ):
+        self.db = db
+        self.table = table
+        self.columns = columns
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[Any, List[asyncio.Future]] = {}
+        self._tasks: set = set()
+    
+    async def load(self, key: Any) -> Optional[dict]:
+        """Load the row with the given id, or None if it doesn't exist"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            loop.call_soon(self._dispatch)
+        self._pending.setdefault(key, []).append(future)
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        return await future
+    
+    def _dispatch(self) -> None:
+        """Send the queued keys as one batch"""
+        # A full batch is sent early, leaving nothing for its scheduled dispatch
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        task = asyncio.get_running_loop().create_task(self._load_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _load_batch(self, batch: Dict[Any, List[asyncio.Future]]) -> None:
+        try:
+            result = await self.db.table(self.table).select(self.columns).in_('id', list(batch)).execute()
+        except Exception as e:
+            logger.exception("Batch load from %s failed", self.table)
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        
+        rows_by_id = {row['id']: row for row in result.data}
+        for key, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(rows_by_id.get(key))
+
+
+def batch_loader(table: str, columns: str = '*') -> Callable:
+    """Create a FastAPI dependency providing a process-wide BatchLoader for a table"""
+    loader: Optional[BatchLoader] = None
+    
+    async def dependency(db: SupabaseClient = Depends(get_database)) -> BatchLoader:
+        nonlocal loader
+        if loader is None or loader.db is not db:
+            loader = BatchLoader(db, table, columns)
+        return loader
+    
+    return dependency
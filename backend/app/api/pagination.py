@@ -0,0 +1,54 @@
+import base64
+import json
+from typing import Any, List, Optional
+from fastapi import HTTPException
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps([sort_value, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def quote_filter_value(value: Any) -> str:
+    """Quote a value for use inside a PostgREST logical filter"""
+    escaped = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def apply_keyset(query, cursor: str, sort_by: str, descending: bool, nullable: bool = False):
+    """Continue after the cursor position instead of skipping rows with OFFSET
+    
+    NULL sort values come last ascending and first descending (the PostgreSQL
+    default); pass nullable for columns that may hold them.
+    """
+    last_value, last_id = decode_cursor(cursor)
+    op = 'lt' if descending else 'gt'
+    if last_value is None:
+        if descending:
+            return query.or_(f"{sort_by}.not.is.null,id.lt.{last_id}")
+        return query.is_(sort_by, 'null').gt('id', last_id)
+    value = quote_filter_value(last_value)
+    # Ascending, the NULL rows are still ahead of any value
+    null_rows = f",{sort_by}.is.null" if nullable and not descending else ""
+    return query.or_(
+        f"{sort_by}.{op}.{value},"
+        f"and({sort_by}.eq.{value},id.{op}.{last_id})"
+        f"{null_rows}"
+    )
+
+
+def next_cursor(rows: List[dict], sort_by: str, has_next: bool) -> Optional[str]:
+    """Build the cursor for the page following rows"""
+    # A NULL sort value is kept in the cursor; apply_keyset continues among the NULLs
+    if not has_next or not rows:
+        return None
+    return encode_cursor(rows[-1][sort_by], rows[-1]['id'])
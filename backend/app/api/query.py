@@ -0,0 +1,22 @@
+import orjson
+
+
+def returning(builder, columns: str):
+    """Limit the columns PostgREST returns for an insert, update or delete"""
+    builder.params = builder.params.add('select', columns)
+    return builder
+
+
+def embed_json_text(row: dict, *fields: str) -> dict:
+    """
+    Mark JSON columns selected as text (column::text) for verbatim output.
+    
+    The values are wrapped in orjson.Fragment, so orjson.dumps writes the
+    JSON text as-is instead of the columns being parsed into dicts and
+    serialized again.
+    """
+    for field in fields:
+        value = row.get(field)
+        if value is not None:
+            row[field] = orjson.Fragment(value)
+    return row
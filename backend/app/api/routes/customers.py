@@ -1,10 +1,12 @@
-from typing import Optional, List
-from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from supabase import Client
-from app.database import get_database
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request, Response
+from fastapi.responses import ORJSONResponse
+from app.database import DatabaseManager, SupabaseClient, get_database
+from app.api.etag import compute_etag, etag_matches
+from app.api.loaders import BatchLoader, batch_loader
+from app.api.pagination import decode_cursor, next_cursor
+from app.api.query import returning
 from app.models.customer import (
-    Customer,
     CustomerCreate,
     CustomerUpdate,
     CustomerResponse,
@@ -15,20 +17,42 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Columns returned by the customer endpoints (matches the Customer model)
+CUSTOMER_COLUMNS = (
+    'id, organization_id, first_name, last_name, email, phone, mobile, date_of_birth, '
+    'address_street, address_city, address_postal_code, address_country, '
+    'insurance_provider, insurance_type, insurance_number, last_exam_date, next_appointment, '
+    'prescription_sphere_right, prescription_sphere_left, prescription_cylinder_right, '
+    'prescription_cylinder_left, prescription_axis_right, prescription_axis_left, '
+    'prescription_addition, prescription_pd, allergies, medical_notes, frame_preferences, '
+    'contact_preference, status, created_at, updated_at'
+)
+# Batches concurrent single-customer lookups into one query
+get_customer_loader = batch_loader('customers', CUSTOMER_COLUMNS)
+
+
+CustomerSortField = Literal['created_at', 'last_name', 'first_name', 'last_exam_date', 'next_appointment']
 
 
-@router.get("/customers", response_model=CustomerListResponse)
+@router.get(
+    "/customers",
+    response_model=None,
+    responses={200: {"model": CustomerListResponse}}
+)
 async def list_customers(
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
     search: Optional[str] = Query(None, description="Search by name or email"),
     status: Optional[CustomerStatus] = Query(None, description="Filter by status"),
     insurance_type: Optional[str] = Query(None, description="Filter by insurance type"),
-    sort_by: Optional[str] = Query("created_at", description="Sort field"),
-    sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$", description="Sort order"),
-    db: Client = Depends(get_database)
-) -> CustomerListResponse:
+    sort_by: CustomerSortField = Query("created_at", description="Sort field"),
+    sort_order: Literal['asc', 'desc'] = Query("desc", description="Sort order"),
+    count_mode: Literal['exact', 'planned', 'estimated'] = Query("estimated", description="Total count method"),
+    cursor: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    db: SupabaseClient = Depends(get_database)
+) -> ORJSONResponse:
     """
     List customers with pagination, filtering, and sorting.
     
@@ -37,182 +61,161 @@ async def list_customers(
     - **search**: Search in first_name, last_name, or email
     - **status**: Filter by customer status
     - **insurance_type**: Filter by insurance type
-    - **sort_by**: Field to sort by (created_at, last_name, last_exam_date, next_appointment)
+    - **sort_by**: Field to sort by (created_at, last_name, first_name, last_exam_date, next_appointment)
     - **sort_order**: Sort order (asc or desc)
+    - **count_mode**: How the total is counted (exact counts rows, planned uses the query planner, estimated counts exactly below 1000 rows)
+    - **cursor**: Continue after the last row of the previous page (keyset pagination, ignores page)
     """
     try:
-        # Calculate offset
-        offset = (page - 1) * per_page
-        
-        # Build query
-        query = db.table('customers').select('*')
-        
-        # Apply filters
-        if search:
-            # Search in name and email fields
-            search_pattern = f"%{search}%"
-            query = query.or_(
-                f"first_name.ilike.{search_pattern},"
-                f"last_name.ilike.{search_pattern},"
-                f"email.ilike.{search_pattern}"
-            )
-        
-        if status:
-            query = query.eq('status', status.value)
-        
-        if insurance_type:
-            query = query.eq('insurance_type', insurance_type)
-        
-        # Apply sorting
-        valid_sort_fields = ['created_at', 'last_name', 'first_name', 'last_exam_date', 'next_appointment']
-        if sort_by not in valid_sort_fields:
-            sort_by = 'created_at'
-        
-        query = query.order(sort_by, desc=(sort_order == 'desc'))
-        
-        query = query.range(offset, offset + per_page - 1)
-        
-        result = query.execute()
-        
-        query = db.table('customers').select('*', count='exact')
-        
-        if search:
-            query = query.or_(
-                f"first_name.ilike.{search_pattern},"
-                f"last_name.ilike.{search_pattern},"
-                f"email.ilike.{search_pattern}"
-            )
-        if status:
-            query = query.eq('status', status.value)
-        if insurance_type:
-            query = query.eq('insurance_type', insurance_type)
-        
-        query = query.order(sort_by, desc=(sort_order == 'desc'))
-        query = query.range(offset, offset + per_page - 1)
-        
-        result = query.execute()
-        total = result.count if result.count else 0
-        
-        # Convert to Pydantic models
-        customers = [Customer(**row) for row in result.data]
-        
-        # Calculate pagination metadata
-        total_pages = (total + per_page - 1) // per_page
-        has_next = page < total_pages
-        has_prev = page > 1
-        
-        return CustomerListResponse(
-            customers=customers,
-            total=total,
-            page=page,
-            per_page=per_page,
-            has_next=has_next,
-            has_prev=has_prev
-        )
+        # Filtering, sorting, pagination and the total count all run inside the
+        # list_customers database function (see schemas/customers.sql)
+        params = {
+            'p_search': search,
+            'p_status': status,
+            'p_insurance_type': insurance_type,
+            'p_sort_by': sort_by,
+            'p_desc': sort_order == 'desc',
+            # One extra row tells whether a next page exists
+            'p_limit': per_page + 1,
+            'p_offset': (page - 1) * per_page,
+            'p_cursor': list(decode_cursor(cursor)) if cursor else None,
+            'p_count': count_mode
+        }
+        # Cached for a short time and cleared by customer writes in this process;
+        # other workers may serve a page for up to the TTL after a write
+        result = await DatabaseManager(db).cached_execute(db.rpc('list_customers', params), 'customers')
+        
+        customers = result.data[0]['data'] if result.data else []
+        total = result.data[0]['total'] if result.data else 0
+        
+        # Calculate pagination metadata; has_next doesn't rely on the total,
+        # which may be an estimate
+        has_next = len(customers) > per_page
+        customers = customers[:per_page]
+        has_prev = True if cursor else page > 1
+        
+        # Rows from the database are already JSON-compatible, so they are returned
+        # as-is instead of being re-validated through the Customer model
+        return ORJSONResponse({
+            "customers": customers,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "has_next": has_next,
+            "has_prev": has_prev,
+            "next_cursor": next_cursor(customers, sort_by, has_next)
+        })
         
-    except Exception as e:
-        logger.error(f"Error listing customers: {e}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error listing customers")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.post("/customers", response_model=CustomerResponse, status_code=201)
 async def create_customer(
     customer: CustomerCreate,
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ) -> CustomerResponse:
     """
     Create a new customer.
     """
     try:
-        # Convert Pydantic model to dict for Supabase
-        customer_data = customer.model_dump(exclude_unset=True)
-        
-        # Convert date/datetime objects to strings for JSON serialization
-        for key, value in customer_data.items():
-            if isinstance(value, datetime):
-                customer_data[key] = value.isoformat()
-            elif isinstance(value, date):
-                customer_data[key] = value.isoformat()
+        # Convert Pydantic model to a JSON-compatible dict for Supabase
+        customer_data = customer.model_dump(exclude_unset=True, mode='json')
         
         # Execute insert
-        result = db.table('customers').insert(customer_data).execute()
+        result = await returning(db.table('customers').insert(customer_data), CUSTOMER_COLUMNS).execute()
         
         if not result.data:
             raise HTTPException(status_code=400, detail="Failed to create customer")
         
+        DatabaseManager.invalidate('customers')
+        
         # Return created customer
-        return Customer(**result.data[0])
+        return result.data[0]
         
     except Exception as e:
-        logger.error(f"Error creating customer: {e}")
+        logger.exception("Error creating customer")
         if "duplicate key value" in str(e):
             raise HTTPException(status_code=409, detail="Customer with this email already exists")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.get("/customers/{customer_id}", response_model=CustomerResponse)
+@router.get(
+    "/customers/{customer_id}",
+    response_model=None,
+    responses={200: {"model": CustomerResponse}}
+)
 async def get_customer(
+    request: Request,
     customer_id: int = Path(..., description="Customer ID"),
-    db: Client = Depends(get_database)
-) -> CustomerResponse:
+    loader: BatchLoader = Depends(get_customer_loader)
+) -> ORJSONResponse:
     """
     Get a specific customer by ID.
+    
+    Responds with an ETag derived from updated_at and returns 304 when the
+    client's If-None-Match still matches.
     """
     try:
-        result = db.table('customers').select('*').eq('id', customer_id).execute()
+        row = await loader.load(customer_id)
         
-        if not result.data:
+        if row is None:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        return Customer(**result.data[0])
+        etag = compute_etag(row['id'], row['updated_at'])
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        # The row holds exactly CUSTOMER_COLUMNS as stored by a validated write,
+        # so like the list it is returned without re-validation
+        return ORJSONResponse(
+            row,
+            headers={"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+        )
         
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Error getting customer {customer_id}: {e}")
+    except Exception:
+        logger.exception("Error getting customer %s", customer_id)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.put("/customers/{customer_id}", response_model=CustomerResponse)
 async def update_customer(
+    customer_update: CustomerUpdate,
     customer_id: int = Path(..., description="Customer ID"),
-    customer_update: CustomerUpdate = None,
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ) -> CustomerResponse:
     """
     Update a customer's information.
     """
     try:
-        # Check if customer exists
-        existing = db.table('customers').select('id').eq('id', customer_id).execute()
-        if not existing.data:
-            raise HTTPException(status_code=404, detail="Customer not found")
-        
         # Get update data (exclude unset fields)
-        update_data = customer_update.model_dump(exclude_unset=True)
+        update_data = customer_update.model_dump(exclude_unset=True, mode='json')
         
         if not update_data:
             raise HTTPException(status_code=400, detail="No fields to update")
         
-        # Convert date/datetime objects to strings for JSON serialization
-        for key, value in update_data.items():
-            if isinstance(value, datetime):
-                update_data[key] = value.isoformat()
-            elif isinstance(value, date):
-                update_data[key] = value.isoformat()
-        
-        # Execute update
-        result = db.table('customers').update(update_data).eq('id', customer_id).execute()
+        # Execute update (an empty result means the customer does not exist)
+        result = await returning(
+            db.table('customers').update(update_data).eq('id', customer_id),
+            CUSTOMER_COLUMNS
+        ).execute()
         
         if not result.data:
-            raise HTTPException(status_code=400, detail="Failed to update customer")
+            raise HTTPException(status_code=404, detail="Customer not found")
+        
+        DatabaseManager.invalidate('customers')
         
-        return Customer(**result.data[0])
+        return result.data[0]
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating customer {customer_id}: {e}")
+        logger.exception("Error updating customer %s", customer_id)
         if "duplicate key value" in str(e):
             raise HTTPException(status_code=409, detail="Customer with this email already exists")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -221,29 +224,33 @@ async def update_customer(
 @router.delete("/customers/{customer_id}", status_code=204)
 async def delete_customer(
     customer_id: int = Path(..., description="Customer ID"),
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ) -> None:
     """
     Soft delete a customer (archive).
     """
     try:
-        # Check if customer exists
-        existing = db.table('customers').select('id, status').eq('id', customer_id).execute()
-        if not existing.data:
-            raise HTTPException(status_code=404, detail="Customer not found")
-        
-        # Soft delete by setting status to archived
-        result = db.table('customers').update({
-            'status': 'archiviert'  # Using the German enum value from the database
-        }).eq('id', customer_id).execute()
-        
+        # Soft delete by setting status to archived; already archived rows are
+        # skipped so repeated deletes don't produce writes
+        result = await returning(
+            db.table('customers').update({
+                'status': 'archiviert'  # Using the German enum value from the database
+            }).eq('id', customer_id).neq('status', 'archiviert'),
+            'id'
+        ).execute()
+        
+        # Nothing updated: either the customer is already archived or doesn't exist
         if not result.data:
-            raise HTTPException(status_code=400, detail="Failed to archive customer")
+            existing = await db.table('customers').select('id').eq('id', customer_id).execute()
+            if not existing.data:
+                raise HTTPException(status_code=404, detail="Customer not found")
+        else:
+            DatabaseManager.invalidate('customers')
         
         return None
         
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Error deleting customer {customer_id}: {e}")
+    except Exception:
+        logger.exception("Error deleting customer %s", customer_id)
         raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
@@ -1,28 +1,85 @@
-from fastapi import APIRouter, Depends
-from supabase import Client
-from app.database import supabase_client, get_database
-from app.config import settings
+import asyncio
+import time
+import orjson
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse
+from app.database import supabase_client
+from app.api.etag import compute_content_etag, etag_matches
+from app.config import Settings, get_settings, settings
 
 router = APIRouter()
 
+# The basic health payload never changes at runtime, so serialize it once
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": "Visual CRM API",
+    "version": settings.PROJECT_VERSION
+})
+_HEALTH_ETAG = compute_content_etag(_HEALTH_BODY)
+
+# Healthy database probe results are reused for a few seconds so frequent
+# liveness/readiness probes don't each hit Supabase
+_DB_HEALTH_TTL_SECONDS = 5.0
+_db_health_cache: tuple[float, dict] | None = None
+_db_health_lock = asyncio.Lock()
+
+
+async def _cached_database_health() -> dict:
+    """Return the last healthy probe result or run a new probe"""
+    global _db_health_cache
+    async with _db_health_lock:
+        if _db_health_cache and time.monotonic() - _db_health_cache[0] < _DB_HEALTH_TTL_SECONDS:
+            return _db_health_cache[1]
+        result = await supabase_client.health_check(probe=True)
+        # Failures are not cached so recovery is detected on the next probe
+        _db_health_cache = (time.monotonic(), result) if result.get("status") == "healthy" else None
+        return result
+
+def _startup_status(request: Request) -> str:
+    """State of the database initialization started by the lifespan: pending, ready or failed"""
+    init_task = getattr(request.app.state, "init_task", None)
+    if init_task is None or not init_task.done():
+        return "pending"
+    if init_task.cancelled() or init_task.exception() is not None:
+        return "failed"
+    return "ready"
+
 @router.get("/health")
-async def health_check():
-    """Basic health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "Visual CRM API",
-        "version": settings.PROJECT_VERSION
-    }
+async def health_check(request: Request) -> Response:
+    """Basic health check endpoint, for liveness probes; doesn't touch the database"""
+    if etag_matches(request, _HEALTH_ETAG):
+        return Response(status_code=304, headers={"ETag": _HEALTH_ETAG})
+    return Response(
+        content=_HEALTH_BODY,
+        media_type="application/json",
+        headers={"ETag": _HEALTH_ETAG, "Cache-Control": "public, max-age=30"}
+    )
+
+@router.get("/health/ready")
+async def readiness_check(request: Request) -> JSONResponse:
+    """Readiness check, 503 until the database initialization has completed"""
+    status = _startup_status(request)
+    return JSONResponse(
+        {"status": status},
+        status_code=200 if status == "ready" else 503,
+        headers={"Cache-Control": "no-store"}
+    )
 
 @router.get("/health/database")
-async def database_health_check():
+async def database_health_check(
+    deep: bool = Query(False, description="Median latency of 5 uncached probes"),
+    app_settings: Settings = Depends(get_settings)
+):
     """Database connectivity health check"""
     try:
-        health_result = await supabase_client.health_check()
+        if deep:
+            health_result = await supabase_client.health_check(probe=True, samples=5)
+        else:
+            health_result = await _cached_database_health()
         return {
             **health_result,
             "service": "Visual CRM API",
-            "version": settings.PROJECT_VERSION
+            "version": app_settings.PROJECT_VERSION
         }
     except Exception as e:
         return {
@@ -30,34 +87,39 @@ async def database_health_check():
             "database": "disconnected",
             "error": str(e),
             "service": "Visual CRM API",
-            "version": settings.PROJECT_VERSION
+            "version": app_settings.PROJECT_VERSION
         }
 
 @router.get("/health/detailed")
-async def detailed_health_check():
+async def detailed_health_check(
+    request: Request,
+    probe: bool = Query(True, description="Query the database; false only reports pool statistics"),
+    app_settings: Settings = Depends(get_settings)
+):
     """Comprehensive health check with database and service status"""
     try:
-        db_health = await supabase_client.health_check()
+        db_health = await supabase_client.health_check(probe=probe)
         
         return {
             "service": {
                 "name": "Visual CRM API",
-                "version": settings.PROJECT_VERSION,
+                "version": app_settings.PROJECT_VERSION,
                 "status": "healthy"
             },
+            "startup": _startup_status(request),
             "database": db_health,
             "environment": {
-                "debug": settings.DEBUG,
-                "host": settings.API_HOST,
-                "port": settings.API_PORT
+                "debug": app_settings.DEBUG,
+                "host": app_settings.API_HOST,
+                "port": app_settings.API_PORT
             },
-            "overall_status": "healthy" if db_health["status"] == "healthy" else "degraded"
+            "overall_status": "degraded" if db_health["status"] == "unhealthy" else "healthy"
         }
     except Exception as e:
         return {
             "service": {
                 "name": "Visual CRM API", 
-                "version": settings.PROJECT_VERSION,
+                "version": app_settings.PROJECT_VERSION,
                 "status": "unhealthy"
             },
             "database": {
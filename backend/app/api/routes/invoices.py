@@ -1,10 +1,14 @@
-from typing import Optional, List
-from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from supabase import Client
-from app.database import get_database
+import asyncio
+from typing import Literal, Optional
+import asyncpg
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request, Response
+from fastapi.responses import ORJSONResponse
+from app.database import DatabaseManager, SupabaseClient, get_database
+from app.pg_pool import get_pg_pool
+from app.api.etag import compute_content_etag, etag_matches
+from app.api.pagination import apply_keyset, next_cursor
+from app.api.query import embed_json_text, returning
 from app.models.invoice import (
-    Invoice,
     InvoiceCreate,
     InvoiceUpdate,
     InvoiceResponse,
@@ -12,18 +16,35 @@ from app.models.invoice import (
     InvoiceStatus,
     InvoiceItem,
     InvoiceItemCreate,
-    InvoiceItemUpdate,
-    InvoiceWithItems
+    InvoiceItemUpdate
 )
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
-@router.get("/invoices", response_model=InvoiceListResponse)
+# Columns needed by the invoice tables; the prescription snapshot is opt-in
+_INVOICE_LIST_COLUMNS = (
+    'id, organization_id, customer_id, invoice_number, invoice_date, due_date, '
+    'subtotal, vat_amount, total, status, created_at, updated_at, '
+    'customer:customers(first_name, last_name, email)'
+)
+# Added with include_items, which the invoice detail panel is rendered from.
+# JSON columns in list rows are fetched as text and embedded unparsed (see embed_json_text)
+_INVOICE_LIST_DETAIL_COLUMNS = (
+    ', insurance_provider, insurance_claim_number, insurance_coverage_amount, '
+    'patient_copay_amount, payment_method, notes, '
+    'items:invoice_items(id, invoice_id, product_id, product_snapshot::text, prescription_values::text, '
+    'quantity, unit_price, discount_amount, vat_rate, line_total, insurance_covered, created_at)'
+)
+
+
+@router.get("/invoices", response_model=None, responses={200: {"model": InvoiceListResponse}})
 async def list_invoices(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
     search: Optional[str] = Query(None, description="Search by invoice number or customer name"),
@@ -35,10 +56,16 @@ async def list_invoices(
     sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$", description="Sort order"),
     organization_id: int = Query(1, description="Organization ID"),
     include_items: bool = Query(False, description="Include invoice items in response"),
-    db: Client = Depends(get_database)
-) -> InvoiceListResponse:
+    include_prescription_snapshot: bool = Query(False, description="Include the prescription snapshot in response"),
+    count_mode: Literal['exact', 'planned', 'estimated'] = Query("estimated", description="Total count method"),
+    cursor: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    db: SupabaseClient = Depends(get_database)
+) -> Response:
     """
     List invoices with pagination, filtering, and sorting.
+    
+    Responds with an ETag of the page content and returns 304 when the
+    client's If-None-Match still matches.
 
     - **page**: Page number (starts at 1)
     - **per_page**: Number of items per page (max 100)
@@ -49,195 +76,207 @@ async def list_invoices(
     - **sort_by**: Field to sort by (created_at, invoice_date, total)
     - **sort_order**: Sort order (asc or desc)
     - **organization_id**: Organization ID for multi-tenancy
-    - **include_items**: Include invoice items in response (default: False)
+    - **include_items**: Include invoice items, payment and insurance details in response (default: False)
+    - **include_prescription_snapshot**: Include the prescription snapshot in response (default: False)
+    - **count_mode**: How the total is counted (estimated, planned or exact)
+    - **cursor**: Continue after the last row of the previous page (keyset pagination, ignores page)
     """
     try:
         # Calculate offset
         offset = (page - 1) * per_page
 
-        # Build query with customer join and optional items join
+        # Build the column list: slim rows by default, detail columns and items on request
+        select_clause = _INVOICE_LIST_COLUMNS
         if include_items:
-            # Fetch invoices with items
-            select_clause = (
-                'id, organization_id, customer_id, invoice_number, invoice_date, due_date, '
-                'prescription_snapshot, insurance_provider, insurance_claim_number, '
-                'insurance_coverage_amount, patient_copay_amount, subtotal, vat_amount, '
-                'total, status, payment_method, notes, created_at, updated_at, '
-                'customers(first_name, last_name, email), '
-                'invoice_items(id, invoice_id, product_id, product_snapshot, prescription_values, '
-                'quantity, unit_price, discount_amount, vat_rate, line_total, insurance_covered, created_at)'
-            )
+            select_clause += _INVOICE_LIST_DETAIL_COLUMNS
+        if include_prescription_snapshot:
+            select_clause += ', prescription_snapshot::text'
+
+        def apply_filters(query):
+            query = query.eq('organization_id', organization_id)
+            
+            if search:
+                # Note: This is a simplified search. For more complex customer name search,
+                # you might need to use a different approach or raw SQL
+                search_pattern = f"%{search}%"
+                query = query.ilike('invoice_number', search_pattern)
+            
+            if status:
+                query = query.eq('status', status)
+            
+            if customer_id:
+                query = query.eq('customer_id', customer_id)
+            
+            if date_from:
+                query = query.gte('invoice_date', date_from)
+            
+            if date_to:
+                query = query.lte('invoice_date', date_to)
+            return query
+        
+        # Data and total count are fetched in a single request. With a cursor the
+        # count is a separate request without the keyset filter, which would
+        # otherwise leave only the rows after the cursor to count
+        if cursor:
+            query = apply_filters(db.table('invoices').select(select_clause))
+            count_query = apply_filters(db.table('invoices').select('id', count=count_mode)).limit(0)
         else:
-            # Fetch basic invoices without items
-            select_clause = (
-                'id, organization_id, customer_id, invoice_number, invoice_date, due_date, '
-                'prescription_snapshot, insurance_provider, insurance_claim_number, '
-                'insurance_coverage_amount, patient_copay_amount, subtotal, vat_amount, '
-                'total, status, payment_method, notes, created_at, updated_at, '
-                'customers(first_name, last_name, email)'
-            )
-
-        query = db.table('invoices').select(select_clause).eq('organization_id', organization_id)
-        
-        # Apply filters
-        if search:
-            # Note: This is a simplified search. For more complex customer name search,
-            # you might need to use a different approach or raw SQL
-            search_pattern = f"%{search}%"
-            query = query.ilike('invoice_number', search_pattern)
-        
-        if status:
-            query = query.eq('status', status.value)
-        
-        if customer_id:
-            query = query.eq('customer_id', customer_id)
-        
-        if date_from:
-            query = query.gte('invoice_date', date_from)
-        
-        if date_to:
-            query = query.lte('invoice_date', date_to)
+            query = apply_filters(db.table('invoices').select(select_clause, count=count_mode))
         
         # Apply sorting
         valid_sort_fields = ['created_at', 'invoice_date', 'total', 'invoice_number']
         if sort_by not in valid_sort_fields:
             sort_by = 'created_at'
         
-        query = query.order(sort_by, desc=(sort_order == 'desc'))
+        descending = sort_order == 'desc'
         
-        # Get total count for pagination
-        count_query = db.table('invoices').select('id', count='exact').eq('organization_id', organization_id)
-        if search:
-            count_query = count_query.ilike('invoice_number', search_pattern)
-        if status:
-            count_query = count_query.eq('status', status.value)
-        if customer_id:
-            count_query = count_query.eq('customer_id', customer_id)
-        if date_from:
-            count_query = count_query.gte('invoice_date', date_from)
-        if date_to:
-            count_query = count_query.lte('invoice_date', date_to)
+        # Continue after the last row of the previous page instead of using OFFSET
+        if cursor:
+            query = apply_keyset(query, cursor, sort_by, descending)
         
-        count_result = count_query.execute()
-        total = count_result.count if count_result.count else 0
+        # The id tiebreaker keeps the order stable for keyset pagination
+        query = query.order(sort_by, desc=descending).order('id', desc=descending)
         
-        # Apply pagination
-        query = query.range(offset, offset + per_page - 1)
+        # Apply pagination; one extra row tells whether a next page exists
+        if cursor:
+            query = query.limit(per_page + 1)
+        else:
+            query = query.range(offset, offset + per_page)
         
         # Execute query
-        result = query.execute()
-
-        # Convert to Pydantic models (flatten customer and items data)
-        invoices = []
-        for row in result.data:
-            customer_data = row.get('customers')
-            items_data = row.get('invoice_items', []) if include_items else None
-
-            # Extract invoice data (exclude nested objects)
-            invoice_data = {k: v for k, v in row.items() if k not in ['customers', 'invoice_items']}
-
-            # Add customer if present
-            if customer_data:
-                invoice_data['customer'] = customer_data
-
-            # Create appropriate model based on include_items flag
-            if include_items:
-                # Create InvoiceWithItems - ensure items_data is always a list
-                if not items_data or not isinstance(items_data, list):
-                    items_data = []
-                items = [InvoiceItem(**item) for item in items_data]
-                invoice_obj = Invoice(**invoice_data)
-                invoices.append(InvoiceWithItems(**invoice_obj.model_dump(), items=items))
-            else:
-                # Create basic Invoice
-                invoices.append(Invoice(**invoice_data))
-        
-        # Calculate pagination metadata
-        total_pages = (total + per_page - 1) // per_page
-        has_next = page < total_pages
-        has_prev = page > 1
-        
-        return InvoiceListResponse(
-            invoices=invoices,
-            total=total,
-            page=page,
-            per_page=per_page,
-            has_next=has_next,
-            has_prev=has_prev
+        if cursor:
+            result, count_result = await asyncio.gather(query.execute(), count_query.execute())
+            total = count_result.count if count_result.count else 0
+        else:
+            result = await query.execute()
+            total = result.count if result.count else 0
+
+        # Calculate pagination metadata; has_next doesn't rely on the total,
+        # which may be an estimate
+        has_next = len(result.data) > per_page
+        rows = result.data[:per_page]
+        has_prev = True if cursor else page > 1
+        
+        for row in rows:
+            if include_prescription_snapshot:
+                embed_json_text(row, 'prescription_snapshot')
+            for item in row.get('items') or ():
+                embed_json_text(item, 'product_snapshot', 'prescription_values')
+        
+        # Embedded resources are aliased to the response field names, so the
+        # rows are serialized as-is instead of being re-validated through the models.
+        # Items carry no updated_at, so the ETag covers the serialized page itself.
+        body = orjson.dumps({
+            "invoices": rows,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "has_next": has_next,
+            "has_prev": has_prev,
+            "next_cursor": next_cursor(rows, sort_by, has_next)
+        })
+        etag = compute_content_etag(body)
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
         )
         
-    except Exception as e:
-        logger.error(f"Error listing invoices: {e}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error listing invoices")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+async def _insert_invoice_with_items(conn: asyncpg.Connection, invoice: InvoiceCreate) -> dict:
+    """Insert an invoice and its items on one connection, returning the invoice as create_invoice does"""
+    invoice_data = invoice.model_dump(exclude_unset=True, exclude={'items'})
+    columns = ', '.join(f'"{key}"' for key in invoice_data)
+    placeholders = ', '.join(f'${i}' for i in range(1, len(invoice_data) + 1))
+    # invoice_number is still assigned by the insert trigger
+    row = await conn.fetchrow(
+        f'''
+        WITH inv AS (INSERT INTO invoices ({columns}) VALUES ({placeholders}) RETURNING *)
+        SELECT inv.*, c.first_name, c.last_name, c.email
+        FROM inv JOIN customers c ON c.id = inv.customer_id
+        ''',
+        *invoice_data.values()
+    )
+    created_invoice = dict(row)
+    created_invoice['customer'] = {
+        key: created_invoice.pop(key) for key in ('first_name', 'last_name', 'email')
+    }
+    
+    items = []
+    if invoice.items:
+        # Every item carries all columns; the model defaults match the column defaults
+        item_fields = list(InvoiceItemCreate.model_fields)
+        await conn.executemany(
+            f'''
+            INSERT INTO invoice_items (invoice_id, {', '.join(item_fields)})
+            VALUES ({', '.join(f'${i}' for i in range(1, len(item_fields) + 2))})
+            ''',
+            [
+                (created_invoice['id'], *item.model_dump(include=set(item_fields)).values())
+                for item in invoice.items
+            ]
+        )
+        items = [
+            dict(record) for record in await conn.fetch(
+                'SELECT * FROM invoice_items WHERE invoice_id = $1 ORDER BY id',
+                created_invoice['id']
+            )
+        ]
+    
+    created_invoice['items'] = items
+    return created_invoice
+
+
 @router.post("/invoices", response_model=InvoiceResponse, status_code=201)
 async def create_invoice(
     invoice: InvoiceCreate,
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ) -> InvoiceResponse:
     """
     Create a new invoice with optional items.
     """
     try:
-        # Convert Pydantic model to dict for Supabase
-        invoice_data = invoice.model_dump(exclude_unset=True, exclude={'items'})
-        
-        # Convert enum to string value
-        if 'status' in invoice_data:
-            invoice_data['status'] = invoice_data['status'].value
-        
-        # Convert date objects to strings
-        for key, value in invoice_data.items():
-            if isinstance(value, date) and not isinstance(value, datetime):
-                invoice_data[key] = value.isoformat()
-        
-        # Convert Decimal to float for JSON serialization
-        decimal_fields = [
-            'insurance_coverage_amount',
-            'patient_copay_amount',
-            'subtotal',
-            'vat_amount',
-            'total'
-        ]
-        for field in decimal_fields:
-            if field in invoice_data and invoice_data[field] is not None:
-                invoice_data[field] = float(invoice_data[field])
+        # With a direct Postgres pool the invoice and its items are written in one transaction
+        if await get_pg_pool() is not None:
+            return await DatabaseManager(db).execute_transactional(
+                lambda conn: _insert_invoice_with_items(conn, invoice)
+            )
+        
+        # Convert Pydantic model to a JSON-ready dict for Supabase (enums, dates and Decimals included)
+        invoice_data = invoice.model_dump(exclude_unset=True, exclude={'items'}, mode='json')
 
-        # Execute insert (invoice_number will be auto-generated by trigger)
-        result = db.table('invoices').insert(invoice_data).execute()
+        # Execute insert (invoice_number will be auto-generated by trigger) and
+        # return the new invoice with customer information in the same request
+        result = await returning(
+            db.table('invoices').insert(invoice_data),
+            '*, customers(first_name, last_name, email)'
+        ).execute()
 
         if not result.data:
             raise HTTPException(status_code=400, detail="Failed to create invoice")
 
-        invoice_id = result.data[0]['id']
-
-        # Fetch invoice with customer information for response
-        invoice_fetch = db.table('invoices').select(
-            '*, customers(first_name, last_name, email)'
-        ).eq('id', invoice_id).execute()
-
-        if not invoice_fetch.data:
-            raise HTTPException(status_code=400, detail="Failed to load created invoice")
-
-        created_invoice = invoice_fetch.data[0]
+        created_invoice = result.data[0]
+        invoice_id = created_invoice['id']
 
-        # Add items if provided
+        # Add all items in a single bulk insert; missing=default keeps column
+        # defaults for fields that are only set on some of the items
         items = []
         if invoice.items:
-            for item in invoice.items:
-                item_data = item.model_dump(exclude_unset=True)
-                item_data['invoice_id'] = invoice_id
-                
-                # Convert Decimal to float
-                decimal_fields = ['unit_price', 'discount_amount', 'vat_rate', 'line_total']
-                for field in decimal_fields:
-                    if field in item_data and item_data[field] is not None:
-                        item_data[field] = float(item_data[field])
-                
-                item_result = db.table('invoice_items').insert(item_data).execute()
-                if item_result.data:
-                    items.append(InvoiceItem(**item_result.data[0]))
+            items_payload = [
+                {**item.model_dump(exclude_unset=True, mode='json'), 'invoice_id': invoice_id}
+                for item in invoice.items
+            ]
+            item_result = await db.table('invoice_items').insert(items_payload, default_to_null=False).execute()
+            items = item_result.data
 
         # Return created invoice with items
         invoice_data_with_customer = created_invoice.copy()
@@ -245,11 +284,11 @@ async def create_invoice(
         if customer_data:
             invoice_data_with_customer['customer'] = customer_data
 
-        invoice_obj = Invoice(**invoice_data_with_customer)
-        return InvoiceWithItems(**invoice_obj.model_dump(), items=items)
+        invoice_data_with_customer['items'] = items
+        return invoice_data_with_customer
         
     except Exception as e:
-        logger.error(f"Error creating invoice: {e}")
+        logger.exception("Error creating invoice")
         if "violates foreign key constraint" in str(e):
             raise HTTPException(status_code=400, detail="Customer not found")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -257,39 +296,49 @@ async def create_invoice(
 
 @router.get("/invoices/{invoice_id}", response_model=InvoiceResponse)
 async def get_invoice(
+    request: Request,
+    response: Response,
     invoice_id: int = Path(..., description="Invoice ID"),
     organization_id: int = Query(1, description="Organization ID"),
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ) -> InvoiceResponse:
     """
     Get a specific invoice by ID with its items.
+    
+    Responds with an ETag of the invoice content and returns 304 when the
+    client's If-None-Match still matches.
     """
     try:
-        # Get invoice
-        invoice_result = db.table('invoices').select(
-            '*, customers(first_name, last_name, email)'
+        # Get invoice with customer and items embedded in one request
+        invoice_result = await db.table('invoices').select(
+            '*, customers(first_name, last_name, email), invoice_items(*)'
         ).eq('id', invoice_id).eq('organization_id', organization_id).execute()
 
         if not invoice_result.data:
             raise HTTPException(status_code=404, detail="Invoice not found")
 
-        # Get invoice items
-        items_result = db.table('invoice_items').select('*').eq('invoice_id', invoice_id).execute()
-        items = [InvoiceItem(**item) for item in items_result.data]
-
         # Return invoice with items
         invoice_data = invoice_result.data[0]
+        invoice_data['items'] = invoice_data.pop('invoice_items', None) or []
         customer_data = invoice_data.pop('customers', None)
         if customer_data:
             invoice_data['customer'] = customer_data
 
-        invoice_obj = Invoice(**invoice_data)
-        return InvoiceWithItems(**invoice_obj.model_dump(), items=items)
+        # Item and customer changes don't touch the invoice's updated_at, so the
+        # ETag is derived from the whole fetched invoice
+        etag = compute_content_etag(orjson.dumps(invoice_data))
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+        # Validated once against the response model
+        return invoice_data
         
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Error getting invoice {invoice_id}: {e}")
+    except Exception:
+        logger.exception("Error getting invoice %s", invoice_id)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -298,74 +347,41 @@ async def update_invoice(
     invoice_update: InvoiceUpdate,
     invoice_id: int = Path(..., description="Invoice ID"),
     organization_id: int = Query(1, description="Organization ID"),
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ) -> InvoiceResponse:
     """
     Update an invoice's information.
     """
     try:
-        # Check if invoice exists
-        existing = db.table('invoices').select('id').eq('id', invoice_id).eq('organization_id', organization_id).execute()
-        if not existing.data:
-            raise HTTPException(status_code=404, detail="Invoice not found")
-        
         # Get update data (exclude unset fields)
-        update_data = invoice_update.model_dump(exclude_unset=True)
+        update_data = invoice_update.model_dump(exclude_unset=True, mode='json')
         
         if not update_data:
             raise HTTPException(status_code=400, detail="No fields to update")
-        
-        # Convert enum to string value
-        if 'status' in update_data and update_data['status']:
-            update_data['status'] = update_data['status'].value
-        
-        # Convert date objects to strings
-        for key, value in update_data.items():
-            if isinstance(value, date) and not isinstance(value, datetime):
-                update_data[key] = value.isoformat()
-        
-        # Convert Decimal to float for JSON serialization
-        decimal_fields = [
-            'insurance_coverage_amount',
-            'patient_copay_amount',
-            'subtotal',
-            'vat_amount',
-            'total'
-        ]
-        for field in decimal_fields:
-            if field in update_data and update_data[field] is not None:
-                update_data[field] = float(update_data[field])
 
-        # Execute update
-        result = db.table('invoices').update(update_data).eq('id', invoice_id).eq('organization_id', organization_id).execute()
+        # Update and return the invoice with customer and items in one request;
+        # no row comes back if it doesn't exist in this organization
+        result = await returning(
+            db.table('invoices').update(update_data).eq('id', invoice_id).eq('organization_id', organization_id),
+            '*, customers(first_name, last_name, email), invoice_items(*)'
+        ).execute()
         
         if not result.data:
-            raise HTTPException(status_code=400, detail="Failed to update invoice")
-
-        # Fetch updated invoice with customer information
-        invoice_fetch = db.table('invoices').select(
-            '*, customers(first_name, last_name, email)'
-        ).eq('id', invoice_id).eq('organization_id', organization_id).execute()
-
-        if not invoice_fetch.data:
-            raise HTTPException(status_code=400, detail="Failed to load updated invoice")
+            raise HTTPException(status_code=404, detail="Invoice not found")
 
-        invoice_data = invoice_fetch.data[0]
+        invoice_data = result.data[0]
+        invoice_data['items'] = invoice_data.pop('invoice_items', None) or []
         customer_data = invoice_data.pop('customers', None)
         if customer_data:
             invoice_data['customer'] = customer_data
 
-        # Get updated invoice with items
-        items_result = db.table('invoice_items').select('*').eq('invoice_id', invoice_id).execute()
-        items = [InvoiceItem(**item) for item in items_result.data]
-
-        invoice_obj = Invoice(**invoice_data)
-        return InvoiceWithItems(**invoice_obj.model_dump(), items=items)
+        # Validated once against the response model
+        return invoice_data
         
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Error updating invoice {invoice_id}: {e}")
+    except Exception:
+        logger.exception("Error updating invoice %s", invoice_id)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -373,120 +389,102 @@ async def update_invoice(
 async def delete_invoice(
     invoice_id: int = Path(..., description="Invoice ID"),
     organization_id: int = Query(1, description="Organization ID"),
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ) -> None:
     """
     Delete an invoice (hard delete with cascade to items).
     """
     try:
-        # Check if invoice exists
-        existing = db.table('invoices').select('id').eq('id', invoice_id).eq('organization_id', organization_id).execute()
-        if not existing.data:
-            raise HTTPException(status_code=404, detail="Invoice not found")
-        
-        # Delete invoice (items will be cascade deleted by database)
-        result = db.table('invoices').delete().eq('id', invoice_id).eq('organization_id', organization_id).execute()
+        # Delete invoice (items will be cascade deleted by database); no row comes
+        # back if it doesn't exist in this organization
+        result = await returning(
+            db.table('invoices').delete().eq('id', invoice_id).eq('organization_id', organization_id),
+            'id'
+        ).execute()
         
         if not result.data:
-            raise HTTPException(status_code=400, detail="Failed to delete invoice")
+            raise HTTPException(status_code=404, detail="Invoice not found")
         
         return None
         
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Error deleting invoice {invoice_id}: {e}")
+    except Exception:
+        logger.exception("Error deleting invoice %s", invoice_id)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 # Invoice Items endpoints
 @router.post("/invoices/{invoice_id}/items", response_model=InvoiceItem, status_code=201)
 async def add_invoice_item(
+    item: InvoiceItemCreate,
     invoice_id: int = Path(..., description="Invoice ID"),
-    item: InvoiceItemCreate = None,
     organization_id: int = Query(1, description="Organization ID"),
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ):
     """
     Add an item to an existing invoice.
     """
     try:
         # Verify invoice exists and belongs to organization
-        invoice_check = db.table('invoices').select('id').eq('id', invoice_id).eq('organization_id', organization_id).execute()
+        invoice_check = await db.table('invoices').select('id').eq('id', invoice_id).eq('organization_id', organization_id).execute()
         if not invoice_check.data:
             raise HTTPException(status_code=404, detail="Invoice not found")
         
         # Prepare item data
-        item_data = item.model_dump(exclude_unset=True)
+        item_data = item.model_dump(exclude_unset=True, mode='json')
         item_data['invoice_id'] = invoice_id
         
-        # Convert Decimal to float
-        decimal_fields = ['unit_price', 'discount_amount', 'vat_rate', 'line_total']
-        for field in decimal_fields:
-            if field in item_data and item_data[field] is not None:
-                item_data[field] = float(item_data[field])
-        
         # Insert item
-        result = db.table('invoice_items').insert(item_data).execute()
+        result = await db.table('invoice_items').insert(item_data).execute()
         
         if not result.data:
             raise HTTPException(status_code=400, detail="Failed to add invoice item")
         
-        return InvoiceItem(**result.data[0])
+        return result.data[0]
         
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Error adding item to invoice {invoice_id}: {e}")
+    except Exception:
+        logger.exception("Error adding item to invoice %s", invoice_id)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.put("/invoices/{invoice_id}/items/{item_id}", response_model=InvoiceItem)
 async def update_invoice_item(
+    item_update: InvoiceItemUpdate,
     invoice_id: int = Path(..., description="Invoice ID"),
     item_id: int = Path(..., description="Item ID"),
-    item_update: InvoiceItemUpdate = None,
     organization_id: int = Query(1, description="Organization ID"),
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ):
     """
     Update an invoice item.
     """
     try:
         # Verify invoice exists and belongs to organization
-        invoice_check = db.table('invoices').select('id').eq('id', invoice_id).eq('organization_id', organization_id).execute()
+        invoice_check = await db.table('invoices').select('id').eq('id', invoice_id).eq('organization_id', organization_id).execute()
         if not invoice_check.data:
             raise HTTPException(status_code=404, detail="Invoice not found")
         
-        # Check if item exists and belongs to invoice
-        existing = db.table('invoice_items').select('id').eq('id', item_id).eq('invoice_id', invoice_id).execute()
-        if not existing.data:
-            raise HTTPException(status_code=404, detail="Invoice item not found")
-        
         # Get update data
-        update_data = item_update.model_dump(exclude_unset=True)
+        update_data = item_update.model_dump(exclude_unset=True, mode='json')
         
         if not update_data:
             raise HTTPException(status_code=400, detail="No fields to update")
         
-        # Convert Decimal to float
-        decimal_fields = ['unit_price', 'discount_amount', 'vat_rate', 'line_total']
-        for field in decimal_fields:
-            if field in update_data and update_data[field] is not None:
-                update_data[field] = float(update_data[field])
-        
-        # Update item
-        result = db.table('invoice_items').update(update_data).eq('id', item_id).eq('invoice_id', invoice_id).execute()
+        # Update item; no row comes back if it doesn't belong to the invoice
+        result = await db.table('invoice_items').update(update_data).eq('id', item_id).eq('invoice_id', invoice_id).execute()
         
         if not result.data:
-            raise HTTPException(status_code=400, detail="Failed to update invoice item")
+            raise HTTPException(status_code=404, detail="Invoice item not found")
         
-        return InvoiceItem(**result.data[0])
+        return result.data[0]
         
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Error updating invoice item {item_id}: {e}")
+    except Exception:
+        logger.exception("Error updating invoice item %s", item_id)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -495,32 +493,30 @@ async def delete_invoice_item(
     invoice_id: int = Path(..., description="Invoice ID"),
     item_id: int = Path(..., description="Item ID"),
     organization_id: int = Query(1, description="Organization ID"),
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ):
     """
     Delete an invoice item.
     """
     try:
         # Verify invoice exists and belongs to organization
-        invoice_check = db.table('invoices').select('id').eq('id', invoice_id).eq('organization_id', organization_id).execute()
+        invoice_check = await db.table('invoices').select('id').eq('id', invoice_id).eq('organization_id', organization_id).execute()
         if not invoice_check.data:
             raise HTTPException(status_code=404, detail="Invoice not found")
         
-        # Check if item exists and belongs to invoice
-        existing = db.table('invoice_items').select('id').eq('id', item_id).eq('invoice_id', invoice_id).execute()
-        if not existing.data:
-            raise HTTPException(status_code=404, detail="Invoice item not found")
-        
-        # Delete item
-        result = db.table('invoice_items').delete().eq('id', item_id).eq('invoice_id', invoice_id).execute()
+        # Delete item; no row comes back if it doesn't belong to the invoice
+        result = await returning(
+            db.table('invoice_items').delete().eq('id', item_id).eq('invoice_id', invoice_id),
+            'id'
+        ).execute()
         
         if not result.data:
-            raise HTTPException(status_code=400, detail="Failed to delete invoice item")
+            raise HTTPException(status_code=404, detail="Invoice item not found")
         
         return None
         
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Error deleting invoice item {item_id}: {e}")
+    except Exception:
+        logger.exception("Error deleting invoice item %s", item_id)
         raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
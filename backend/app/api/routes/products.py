@@ -1,10 +1,13 @@
-from typing import Optional, List
+import asyncio
+from typing import Literal, Optional, List
 from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from supabase import Client
-from app.database import get_database
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request, Response
+from fastapi.responses import ORJSONResponse
+from app.database import DatabaseManager, SupabaseClient, get_database
+from app.api.etag import compute_content_etag, compute_etag, etag_matches
+from app.api.pagination import apply_keyset, next_cursor, quote_filter_value
+from app.api.query import returning
 from app.models.product import (
-    Product,
     ProductCreate,
     ProductUpdate,
     ProductResponse,
@@ -12,14 +15,34 @@ from app.models.product import (
     ProductType
 )
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
+_CACHE_CONTROL = "private, max-age=0, must-revalidate"
 
-@router.get("/products", response_model=ProductListResponse)
+# or= filter for the product search, built once; only the pattern is filled in per request
+_PRODUCT_SEARCH_FILTER = ','.join(
+    f"{field}.ilike.{{pattern}}" for field in ('name', 'brand', 'model', 'sku')
+)
+
+
+def _product_list_response(request: Request, body: bytes, etag: str) -> Response:
+    """Answer with the serialized page, or 304 if the client already has it"""
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": _CACHE_CONTROL}
+    )
+
+
+@router.get("/products", response_model=None, responses={200: {"model": ProductListResponse}})
 async def list_products(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
     search: Optional[str] = Query(None, description="Search by name, brand, model, or SKU"),
@@ -28,8 +51,10 @@ async def list_products(
     sort_by: Optional[str] = Query("created_at", description="Sort field"),
     sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$", description="Sort order"),
     organization_id: int = Query(1, description="Organization ID"),
-    db: Client = Depends(get_database)
-) -> ProductListResponse:
+    count_mode: Literal['exact', 'planned', 'estimated'] = Query("estimated", description="Total count method"),
+    cursor: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    db: SupabaseClient = Depends(get_database)
+) -> Response:
     """
     List products with pagination, filtering, and sorting.
     
@@ -41,116 +66,126 @@ async def list_products(
     - **sort_by**: Field to sort by (created_at, name, brand, current_price)
     - **sort_order**: Sort order (asc or desc)
     - **organization_id**: Organization ID for multi-tenancy
+    - **count_mode**: How the total is counted (estimated, planned or exact)
+    - **cursor**: Continue after the last row of the previous page (keyset pagination, ignores page)
+    
+    Responds with an ETag of the page content and returns 304 when the
+    client's If-None-Match still matches.
     """
     try:
         # Calculate offset
         offset = (page - 1) * per_page
         
-        # Build query
-        query = db.table('products').select('*').eq('organization_id', organization_id)
-        
-        # Apply filters
-        if search:
-            # Search in name, brand, model, and SKU fields
-            search_pattern = f"%{search}%"
-            query = query.or_(
-                f"name.ilike.{search_pattern},"
-                f"brand.ilike.{search_pattern},"
-                f"model.ilike.{search_pattern},"
-                f"sku.ilike.{search_pattern}"
-            )
-        
-        if product_type:
-            query = query.eq('product_type', product_type.value)
-        
-        if active_only:
-            query = query.eq('active', True)
+        def apply_filters(query):
+            query = query.eq('organization_id', organization_id)
+            
+            if search:
+                # Search in name, brand, model, and SKU fields (backed by pg_trgm GIN indexes).
+                # Quoting keeps commas or parentheses in the term from breaking the filter
+                query = query.or_(_PRODUCT_SEARCH_FILTER.format(pattern=quote_filter_value(f"*{search}*")))
+            
+            if product_type:
+                query = query.eq('product_type', product_type)
+            
+            if active_only:
+                query = query.eq('active', True)
+            return query
+        
+        # Data and total count are fetched in a single request. With a cursor the
+        # count is a separate request without the keyset filter, which would
+        # otherwise leave only the rows after the cursor to count
+        if cursor:
+            query = apply_filters(db.table('products').select('*'))
+            count_query = apply_filters(db.table('products').select('id', count=count_mode)).limit(0)
+        else:
+            query = apply_filters(db.table('products').select('*', count=count_mode))
         
         # Apply sorting
         valid_sort_fields = ['created_at', 'name', 'brand', 'current_price', 'product_type']
         if sort_by not in valid_sort_fields:
             sort_by = 'created_at'
         
-        query = query.order(sort_by, desc=(sort_order == 'desc'))
-        
-        # Get total count for pagination
-        count_query = db.table('products').select('id', count='exact').eq('organization_id', organization_id)
-        if search:
-            count_query = count_query.or_(
-                f"name.ilike.{search_pattern},"
-                f"brand.ilike.{search_pattern},"
-                f"model.ilike.{search_pattern},"
-                f"sku.ilike.{search_pattern}"
-            )
-        if product_type:
-            count_query = count_query.eq('product_type', product_type.value)
-        if active_only:
-            count_query = count_query.eq('active', True)
-        
-        count_result = count_query.execute()
-        total = count_result.count if count_result.count else 0
-        
-        # Apply pagination
-        query = query.range(offset, offset + per_page - 1)
+        descending = sort_order == 'desc'
         
-        # Execute query
-        result = query.execute()
+        # Continue after the last row of the previous page instead of using OFFSET
+        if cursor:
+            query = apply_keyset(query, cursor, sort_by, descending, nullable=sort_by == 'brand')
         
-        # Convert to Pydantic models
-        products = [Product(**row) for row in result.data]
+        # The id tiebreaker keeps the order stable for keyset pagination
+        query = query.order(sort_by, desc=descending).order('id', desc=descending)
         
-        # Calculate pagination metadata
-        total_pages = (total + per_page - 1) // per_page
-        has_next = page < total_pages
-        has_prev = page > 1
+        # Apply pagination; one extra row tells whether a next page exists
+        if cursor:
+            query = query.limit(per_page + 1)
+        else:
+            query = query.range(offset, offset + per_page)
         
-        return ProductListResponse(
-            products=products,
-            total=total,
-            page=page,
-            per_page=per_page,
-            has_next=has_next,
-            has_prev=has_prev
-        )
+        # Execute query; results are cached for a short time and cleared by product
+        # writes in this process, other workers may serve a page for up to the TTL
+        db_manager = DatabaseManager(db)
+        if cursor:
+            result, count_result = await asyncio.gather(
+                db_manager.cached_execute(query, 'products'),
+                db_manager.cached_execute(count_query, 'products')
+            )
+            total = count_result.count if count_result.count else 0
+        else:
+            result = await db_manager.cached_execute(query, 'products')
+            total = result.count if result.count else 0
+        
+        # Calculate pagination metadata; has_next doesn't rely on the total,
+        # which may be an estimate
+        has_next = len(result.data) > per_page
+        rows = result.data[:per_page]
+        has_prev = True if cursor else page > 1
+        
+        # Rows from the database are already JSON-compatible, so they are serialized
+        # as-is instead of being re-validated through the Product model
+        body = orjson.dumps({
+            "products": rows,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "has_next": has_next,
+            "has_prev": has_prev,
+            "next_cursor": next_cursor(rows, sort_by, has_next)
+        })
+        etag = compute_content_etag(body)
+        
+        return _product_list_response(request, body, etag)
         
-    except Exception as e:
-        logger.error(f"Error listing products: {e}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error listing products")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @router.post("/products", response_model=ProductResponse, status_code=201)
 async def create_product(
     product: ProductCreate,
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ) -> ProductResponse:
     """
     Create a new product.
     """
     try:
-        # Convert Pydantic model to dict for Supabase
-        product_data = product.model_dump(exclude_unset=True)
-        
-        # Convert enum to string value
-        if 'product_type' in product_data:
-            product_data['product_type'] = product_data['product_type'].value
-        
-        # Convert Decimal to float for JSON serialization
-        if 'current_price' in product_data:
-            product_data['current_price'] = float(product_data['current_price'])
-        if 'vat_rate' in product_data:
-            product_data['vat_rate'] = float(product_data['vat_rate'])
+        # Convert Pydantic model to a JSON-ready dict for Supabase (enums and Decimals included)
+        product_data = product.model_dump(exclude_unset=True, mode='json')
         
         # Execute insert
-        result = db.table('products').insert(product_data).execute()
+        result = await db.table('products').insert(product_data).execute()
         
         if not result.data:
             raise HTTPException(status_code=400, detail="Failed to create product")
         
+        DatabaseManager.invalidate('products')
+        
         # Return created product
-        return Product(**result.data[0])
+        return result.data[0]
         
     except Exception as e:
-        logger.error(f"Error creating product: {e}")
+        logger.exception("Error creating product")
         if "duplicate key value" in str(e):
             raise HTTPException(status_code=409, detail="Product with this SKU already exists")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -158,25 +193,37 @@ async def create_product(
 
 @router.get("/products/{product_id}", response_model=ProductResponse)
 async def get_product(
+    request: Request,
+    response: Response,
     product_id: int = Path(..., description="Product ID"),
     organization_id: int = Query(1, description="Organization ID"),
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ) -> ProductResponse:
     """
     Get a specific product by ID.
+    
+    Responds with an ETag derived from updated_at and returns 304 when the
+    client's If-None-Match still matches.
     """
     try:
-        result = db.table('products').select('*').eq('id', product_id).eq('organization_id', organization_id).execute()
+        result = await db.table('products').select('*').eq('id', product_id).eq('organization_id', organization_id).execute()
         
         if not result.data:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        return Product(**result.data[0])
+        row = result.data[0]
+        etag = compute_etag(row['id'], row['updated_at'])
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = _CACHE_CONTROL
+        return row
         
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Error getting product {product_id}: {e}")
+    except Exception:
+        logger.exception("Error getting product %s", product_id)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -185,45 +232,32 @@ async def update_product(
     product_update: ProductUpdate,
     product_id: int = Path(..., description="Product ID"),
     organization_id: int = Query(1, description="Organization ID"),
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ) -> ProductResponse:
     """
     Update a product's information.
     """
     try:
-        # Check if product exists
-        existing = db.table('products').select('id').eq('id', product_id).eq('organization_id', organization_id).execute()
-        if not existing.data:
-            raise HTTPException(status_code=404, detail="Product not found")
-        
         # Get update data (exclude unset fields)
-        update_data = product_update.model_dump(exclude_unset=True)
+        update_data = product_update.model_dump(exclude_unset=True, mode='json')
         
         if not update_data:
             raise HTTPException(status_code=400, detail="No fields to update")
         
-        # Convert enum to string value
-        if 'product_type' in update_data and update_data['product_type']:
-            update_data['product_type'] = update_data['product_type'].value
-        
-        # Convert Decimal to float for JSON serialization
-        if 'current_price' in update_data and update_data['current_price']:
-            update_data['current_price'] = float(update_data['current_price'])
-        if 'vat_rate' in update_data and update_data['vat_rate']:
-            update_data['vat_rate'] = float(update_data['vat_rate'])
-        
-        # Execute update
-        result = db.table('products').update(update_data).eq('id', product_id).eq('organization_id', organization_id).execute()
+        # Execute update; no row comes back if it doesn't exist in this organization
+        result = await db.table('products').update(update_data).eq('id', product_id).eq('organization_id', organization_id).execute()
         
         if not result.data:
-            raise HTTPException(status_code=400, detail="Failed to update product")
+            raise HTTPException(status_code=404, detail="Product not found")
         
-        return Product(**result.data[0])
+        DatabaseManager.invalidate('products')
+        
+        return result.data[0]
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating product {product_id}: {e}")
+        logger.exception("Error updating product %s", product_id)
         if "duplicate key value" in str(e):
             raise HTTPException(status_code=409, detail="Product with this SKU already exists")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -233,29 +267,30 @@ async def update_product(
 async def delete_product(
     product_id: int = Path(..., description="Product ID"),
     organization_id: int = Query(1, description="Organization ID"),
-    db: Client = Depends(get_database)
+    db: SupabaseClient = Depends(get_database)
 ) -> None:
     """
     Soft delete a product (set active to false).
     """
     try:
-        # Check if product exists
-        existing = db.table('products').select('id, active').eq('id', product_id).eq('organization_id', organization_id).execute()
-        if not existing.data:
-            raise HTTPException(status_code=404, detail="Product not found")
-        
-        # Soft delete by setting active to false
-        result = db.table('products').update({
-            'active': False
-        }).eq('id', product_id).eq('organization_id', organization_id).execute()
+        # Soft delete by setting active to false; no row comes back if it
+        # doesn't exist in this organization
+        result = await returning(
+            db.table('products').update({
+                'active': False
+            }).eq('id', product_id).eq('organization_id', organization_id),
+            'id'
+        ).execute()
         
         if not result.data:
-            raise HTTPException(status_code=400, detail="Failed to deactivate product")
+            raise HTTPException(status_code=404, detail="Product not found")
+        
+        DatabaseManager.invalidate('products')
         
         return None
         
     except HTTPException:
         raise
-    except Exception as e:
-        logger.error(f"Error deleting product {product_id}: {e}")
+    except Exception:
+        logger.exception("Error deleting product %s", product_id)
         raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
@@ -1,34 +1,57 @@
 import os
-from dotenv import load_dotenv
+from functools import lru_cache
+from pydantic import AliasChoices, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-load_dotenv()
+class Settings(BaseSettings):
+    # Read once at startup and immutable afterwards
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore", frozen=True)
 
-class Settings:
     # Project Configuration
-    PROJECT_NAME: str = os.getenv("PROJECT_NAME", "Visual CRM")
-    PROJECT_VERSION: str = os.getenv("PROJECT_VERSION", "1.0.0")
-    
+    PROJECT_NAME: str = "Visual CRM"
+    PROJECT_VERSION: str = "1.0.0"
+
     # Supabase Configuration
-    SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
-    SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
-    
+    SUPABASE_URL: str = ""
+    SUPABASE_KEY: str = ""
+    SUPABASE_MAX_CONNECTIONS: int = 15
+    SUPABASE_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    SUPABASE_KEEPALIVE_EXPIRY: float = 30.0
+    SUPABASE_TIMEOUT: float = 10.0
+    SUPABASE_CONNECT_TIMEOUT: float = 2.0
+
+    # Direct Postgres connection through Supavisor (transaction mode, port 6543),
+    # used for multi-statement writes; empty disables it
+    SUPAVISOR_URL: str = ""
+    SUPAVISOR_POOL_SIZE: int = 10
+
     # FastAPI Configuration
-    API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
-    API_PORT: int = int(os.getenv("API_PORT", "8000"))
-    DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
-    API_V1_PREFIX: str = os.getenv("API_V1_PREFIX", "/api/v1")
-    
+    API_HOST: str = "0.0.0.0"
+    API_PORT: int = 8000
+    DEBUG: bool = True
+    API_V1_PREFIX: str = "/api/v1"
+
     # CORS Configuration
-    FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
-    
+    FRONTEND_URL: str = "http://localhost:3000"
+
     # Logging Configuration
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
-    
+    LOG_LEVEL: str = "INFO"
+
     # Security Configuration
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "development-key-change-in-production")
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-    
-    # Environment
-    ENVIRONMENT: str = os.getenv("PYTHON_ENV", os.getenv("ENVIRONMENT", "development"))
+    SECRET_KEY: str = "development-key-change-in-production"
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # Environment (PYTHON_ENV takes precedence, as set on Railway)
+    ENVIRONMENT: str = Field("development", validation_alias=AliasChoices("PYTHON_ENV", "ENVIRONMENT"))
+
+def _env_file() -> str | None:
+    """The .env file is only read outside production, where the platform injects the variables"""
+    environment = os.getenv("PYTHON_ENV") or os.getenv("ENVIRONMENT", "development")
+    return None if environment == "production" else ".env"
+
+@lru_cache
+def get_settings() -> Settings:
+    """Settings are read from the environment once and shared, also as a dependency"""
+    return Settings(_env_file=_env_file())
 
-settings = Settings()
\ No newline at end of file
+settings = get_settings()
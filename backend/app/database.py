@@ -1,28 +1,55 @@
 import asyncio
-from typing import AsyncGenerator, Optional
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncpg
+import httpx
+import orjson
 from fastapi import HTTPException
-from supabase import create_client, Client
-from supabase.client import ClientOptions
+from postgrest import AsyncPostgrestClient, AsyncRequestBuilder, AsyncRPCFilterRequestBuilder
+from supabase import AsyncClient
 from app.config import settings
+from app.pg_pool import close_pg_pool, get_pg_pool, pg_pool_stats
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Tables read by the PostgREST health probe
+HEALTH_CHECK_TABLES = ("customers", "products", "invoices")
+
+
 class SupabaseClient:
     """Supabase database client singleton"""
     
     _instance: Optional['SupabaseClient'] = None
-    _client: Optional[Client] = None
+    _client: Optional[AsyncClient] = None
+    # The PostgREST client configured at startup; the SDK drops its own reference
+    # on auth state changes and would rebuild it without the tuned session
+    _postgrest: Optional[AsyncPostgrestClient] = None
+    _transport: Optional[httpx.AsyncHTTPTransport] = None
+    # Only taken while the instance or client is still missing; reads after
+    # construction don't lock
+    _lock = threading.Lock()
     
     def __new__(cls) -> 'SupabaseClient':
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
         return cls._instance
     
     def __init__(self):
+        self._ensure_client()
+    
+    def _ensure_client(self) -> None:
+        """Create the client once, even if several threads get here at the same time"""
         if self._client is None:
-            self._initialize_client()
+            with self._lock:
+                if self._client is None:
+                    self._initialize_client()
     
     def _initialize_client(self) -> None:
         """Initialize the Supabase client"""
@@ -30,50 +57,152 @@ class SupabaseClient:
             if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
                 raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
             
-            self._client = create_client(
+            # The async client lets route handlers await PostgREST calls
+            # instead of blocking the event loop
+            client = AsyncClient(
                 settings.SUPABASE_URL,
                 settings.SUPABASE_KEY
             )
+            self._configure_http_pool(client)
+            # Published only once fully configured, since readers don't lock
+            self._postgrest = client.postgrest
+            self._client = client
             
             logger.info("Supabase client initialized successfully")
             
         except Exception as e:
-            logger.error(f"Failed to initialize Supabase client: {e}")
+            logger.error("Failed to initialize Supabase client: %s", e)
             raise
     
+    def _configure_http_pool(self, client: AsyncClient) -> None:
+        """Give PostgREST a single keep-alive session with a sized connection pool"""
+        postgrest = client.postgrest
+        default_session = postgrest.session
+        # retries=1 re-establishes a connection that the pooler dropped
+        # instead of failing the request
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY
+            ),
+            http2=True,
+            retries=1
+        )
+        postgrest.session = httpx.AsyncClient(
+            base_url=default_session.base_url,
+            headers=default_session.headers,
+            # Fail fast when the pooler can't be reached instead of waiting on the library default
+            timeout=httpx.Timeout(settings.SUPABASE_TIMEOUT, connect=settings.SUPABASE_CONNECT_TIMEOUT),
+            transport=self._transport,
+            follow_redirects=True
+        )
+    
+    def pool_stats(self) -> dict:
+        """Report the state of the PostgREST connection pool"""
+        # httpx doesn't expose pool metrics publicly, so read them from httpcore
+        pool = getattr(self._transport, '_pool', None)
+        connections = pool.connections if pool else []
+        return {
+            "max_connections": settings.SUPABASE_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+            "keepalive_expiry": settings.SUPABASE_KEEPALIVE_EXPIRY,
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for connection in connections if connection.is_idle())
+        }
+    
     @property
-    def client(self) -> Client:
+    def postgrest(self) -> AsyncPostgrestClient:
+        """Get the configured PostgREST client"""
+        self._ensure_client()
+        return self._postgrest
+    
+    @property
+    def client(self) -> AsyncClient:
         """Get the Supabase client instance"""
-        if self._client is None:
-            self._initialize_client()
+        self._ensure_client()
         return self._client
     
-    async def health_check(self) -> dict:
-        """Check database connection health"""
+    def table(self, name: str) -> AsyncRequestBuilder:
+        """Start a query on a table through the configured PostgREST client"""
+        self._ensure_client()
+        return self._postgrest.from_(name)
+    
+    def rpc(self, fn: str, params: Optional[Dict[str, Any]] = None) -> AsyncRPCFilterRequestBuilder:
+        """Call a database function through the configured PostgREST client"""
+        self._ensure_client()
+        return self._postgrest.rpc(fn, params or {})
+    
+    async def _probe_tables(self) -> Dict[str, str]:
+        """Read one row from each of HEALTH_CHECK_TABLES concurrently, reporting "ok" or the error per table"""
+        manager = DatabaseManager(self)
+        results = await asyncio.gather(
+            *(manager.raw_get(table, select='id', limit=1) for table in HEALTH_CHECK_TABLES),
+            return_exceptions=True
+        )
+        return {
+            table: str(result) if isinstance(result, Exception) else "ok"
+            for table, result in zip(HEALTH_CHECK_TABLES, results)
+        }
+    
+    async def health_check(self, probe: bool = False, samples: int = 1) -> dict:
+        """Report connection pool state and, with probe, check the database round trip
+        
+        The probe runs SELECT 1 on the direct Postgres pool when it is configured,
+        otherwise one-row PostgREST reads of the main tables, sent concurrently.
+        With several samples the median latency is reported.
+        """
+        pools = {"connection_pool": self.pool_stats()}
+        pg_stats = pg_pool_stats()
+        if pg_stats is not None:
+            pools["pg_pool"] = pg_stats
+        if not probe:
+            return {"status": "not_probed", **pools}
+        
         try:
-            # Simple query to test connection
-            result = self._client.table('customers').select('id').limit(1).execute()
+            pool = await get_pg_pool()
+            latencies = []
+            tables = None
+            for _ in range(samples):
+                started = time.perf_counter()
+                if pool is not None:
+                    async with pool.acquire() as conn:
+                        await conn.fetchval("SELECT 1")
+                else:
+                    tables = await self._probe_tables()
+                latencies.append((time.perf_counter() - started) * 1000)
             
-            return {
+            result = {
                 "status": "healthy",
                 "database": "connected",
-                "tables_accessible": True,
-                "response_time_ms": getattr(result, 'response_time', 0)
+                "probe": "postgres" if pool is not None else "postgrest",
+                "response_time_ms": round(statistics.median(latencies), 1),
+                **pools
             }
+            if tables is not None:
+                result["tables"] = tables
+                failed = [table for table, status in tables.items() if status != "ok"]
+                if failed:
+                    logger.error("Database health check failed for tables: %s", tables)
+                    result["status"] = "unhealthy"
+                    if len(failed) == len(tables):
+                        result["database"] = "disconnected"
+            return result
         except Exception as e:
-            logger.error(f"Database health check failed: {e}")
+            logger.error("Database health check failed: %s", e)
             return {
                 "status": "unhealthy",
                 "database": "disconnected",
                 "error": str(e),
-                "tables_accessible": False
+                **pools
             }
     
-    def close(self) -> None:
+    async def close(self) -> None:
         """Close the database connection"""
         if self._client:
-            # Supabase client doesn't have explicit close method
-            # but we can clear the instance
+            # Release the pooled PostgREST connections before dropping the client
+            await self._postgrest.aclose()
+            self._postgrest = None
             self._client = None
             logger.info("Supabase client connection closed")
 
@@ -82,28 +211,100 @@ class SupabaseClient:
 supabase_client = SupabaseClient()
 
 
-async def get_database() -> AsyncGenerator[Client, None]:
-    """Dependency to get database client for FastAPI"""
+async def get_database() -> AsyncGenerator[SupabaseClient, None]:
+    """Dependency to get the database client for FastAPI; routes query through its table() and rpc()"""
     try:
-        yield supabase_client.client
+        yield supabase_client
     except Exception as e:
-        logger.error(f"Database dependency error: {e}")
+        logger.error("Database dependency error: %s", e)
         raise
 
 
 class DatabaseManager:
     """Database operations manager"""
     
-    def __init__(self, client: Client):
+    # Read results shared by all managers in the process, keyed by table and request
+    _CACHE_TTL_SECONDS = 30.0
+    _CACHE_SIZE = 1000
+    _cache: Dict[tuple, Tuple[float, Any]] = {}
+    # Bumped by invalidate(), so reads that were in flight during a write aren't cached
+    _generations: Dict[str, int] = {}
+    
+    def __init__(self, client: SupabaseClient):
         self.client = client
+        # Shared PostgREST session: base URL, auth headers and connection pool
+        self._http = client.postgrest.session
+    
+    async def raw_get(
+        self,
+        table: str,
+        select: str = 'id',
+        limit: Optional[int] = None,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[dict]:
+        """Read rows with a plain PostgREST GET, skipping the query builder and response wrapper
+        
+        filters maps column names to PostgREST operators, e.g. {'status': 'eq.aktiv'}
+        """
+        params = {'select': select, **(filters or {})}
+        if limit is not None:
+            params['limit'] = str(limit)
+        response = await self._http.get(f'/{table}', params=params)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    
+    async def cached_execute(self, query_builder, table: str, ttl: float = _CACHE_TTL_SECONDS):
+        """Execute a read query, reusing the result of an identical query for ttl seconds
+        
+        table names what the query reads, so invalidate(table) drops the result after writes.
+        """
+        key = (
+            table,
+            query_builder.http_method,
+            query_builder.path,
+            str(query_builder.params),
+            query_builder.headers.get('prefer'),
+            orjson.dumps(query_builder.json, option=orjson.OPT_SORT_KEYS) if query_builder.json else None
+        )
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        generation = self._generations.get(table, 0)
+        result = await query_builder.execute()
+        if self._generations.get(table, 0) != generation:
+            # The table was written while the query ran; the result may predate the write
+            return result
+        
+        # Drop the oldest entry once the cache is full
+        if len(self._cache) >= self._CACHE_SIZE:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (time.monotonic() + ttl, result)
+        return result
+    
+    @classmethod
+    def invalidate(cls, table: str) -> None:
+        """Forget cached results read from a table"""
+        cls._generations[table] = cls._generations.get(table, 0) + 1
+        for key in [key for key in cls._cache if key[0] == table]:
+            del cls._cache[key]
+    
+    async def execute_transactional(self, fn: Callable[[asyncpg.Connection], Awaitable[Any]]) -> Any:
+        """Run fn with a direct Postgres connection inside one transaction"""
+        pool = await get_pg_pool()
+        if pool is None:
+            raise RuntimeError("SUPAVISOR_URL is not configured")
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                return await fn(conn)
     
     async def execute_query(self, query_builder):
         """Execute a query with error handling"""
         try:
-            result = query_builder.execute()
+            result = await query_builder.execute()
             return result
         except Exception as e:
-            logger.error(f"Database query failed: {e}")
+            logger.error("Database query failed: %s", e)
             raise
     
     async def create_tables(self) -> bool:
@@ -118,8 +319,8 @@ class DatabaseManager:
             )
             
             if os.path.exists(schema_path):
-                with open(schema_path, 'r', encoding='utf-8') as f:
-                    sql_commands = f.read()
+                # Read off the event loop
+                sql_commands = await asyncio.to_thread(Path(schema_path).read_text, encoding='utf-8')
                 
                 # Note: Supabase doesn't support direct SQL execution via Python client
                 # Tables should be created via Supabase dashboard or CLI
@@ -130,7 +331,7 @@ class DatabaseManager:
                 return False
                 
         except Exception as e:
-            logger.error(f"Failed to create tables: {e}")
+            logger.error("Failed to create tables: %s", e)
             return False
 
 
@@ -138,27 +339,32 @@ async def init_database() -> None:
     """Initialize database connection and tables"""
     try:
         # Test connection
-        health = await supabase_client.health_check()
-        if health["status"] == "healthy":
-            logger.info("Database initialized successfully")
-        else:
-            logger.error(f"Database initialization failed: {health}")
-            
+        health = await supabase_client.health_check(probe=True)
+        if health["status"] != "healthy":
+            # health_check reports failures instead of raising; an unreachable
+            # database must still fail the initialization
+            raise RuntimeError(f"Database health check failed: {health}")
+        
+        # Open the direct Postgres pool up front when it is configured
+        await get_pg_pool()
+        logger.info("Database initialized successfully")
+        
     except Exception as e:
-        logger.error(f"Database initialization error: {e}")
+        logger.error("Database initialization error: %s", e)
         raise
 
 
 async def close_database() -> None:
     """Close database connections"""
     try:
-        supabase_client.close()
+        await supabase_client.close()
+        await close_pg_pool()
         logger.info("Database connections closed")
     except Exception as e:
-        logger.error(f"Error closing database: {e}")
+        logger.error("Error closing database: %s", e)
 
 
 # Legacy compatibility
-def get_supabase_client() -> Client:
+def get_supabase_client() -> AsyncClient:
     """Dependency to get Supabase client instance (legacy)"""
     return supabase_client.client
\ No newline at end of file
@@ -1,7 +1,11 @@
+import asyncio
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 from app.config import settings
+from app.api.etag import ETagMiddleware
 from app.api.routes import health, customers, products, invoices
 from app.database import init_database, close_database
 import logging
@@ -13,27 +17,44 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan management"""
-    # Startup
-    logger.info("Starting Visual CRM API...")
+async def _initialize_database() -> None:
+    """Run the database initialization in the background of startup"""
     try:
         await init_database()
         logger.info("Database initialization completed")
     except Exception as e:
-        logger.error(f"Database initialization failed: {e}")
-        # Continue startup even if database is not available
+        logger.error("Database initialization failed: %s", e)
+        # The app keeps serving; re-raising marks the background task as failed,
+        # which /health/ready reports with a 503
+        raise
+
+@asynccontextmanager
+async def database_lifespan(app: FastAPI):
+    """Start database initialization without blocking startup; close connections on shutdown"""
+    app.state.init_task = asyncio.create_task(_initialize_database())
     
     yield
     
-    # Shutdown
-    logger.info("Shutting down Visual CRM API...")
+    init_task = app.state.init_task
+    if not init_task.done():
+        init_task.cancel()
+    # Let a cancelled or failed initialization settle before closing its connections
+    await asyncio.gather(init_task, return_exceptions=True)
     try:
         await close_database()
         logger.info("Database connections closed")
     except Exception as e:
-        logger.error(f"Error during shutdown: {e}")
+        logger.error("Error during shutdown: %s", e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan management, composed of the lifespans of its parts"""
+    # Startup
+    logger.info("Starting Visual CRM API...")
+    async with database_lifespan(app):
+        yield
+        # Shutdown
+        logger.info("Shutting down Visual CRM API...")
 
 # Create FastAPI application
 app = FastAPI(
@@ -41,6 +62,7 @@ app = FastAPI(
     version=settings.PROJECT_VERSION,
     description="FastAPI backend for Visual CRM - Optician Customer Relationship Management",
     debug=settings.DEBUG,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -48,18 +70,29 @@ app = FastAPI(
 # During development, allow all origins for easier local development
 # In production, restrict to specific frontend URL once deployed
 if settings.ENVIRONMENT == "production":
-    allowed_origins = [settings.FRONTEND_URL]
+    ALLOWED_ORIGINS = frozenset({settings.FRONTEND_URL})
 else:
     # Development: allow localhost on any port
-    allowed_origins = ["http://localhost:3000", "http://localhost:3001", "http://127.0.0.1:3000", "http://127.0.0.1:3001"]
+    ALLOWED_ORIGINS = frozenset({"http://localhost:3000", "http://localhost:3001", "http://127.0.0.1:3000", "http://127.0.0.1:3001"})
 
+# Origins are checked by set membership; browsers may reuse a preflight result
+# for max_age seconds (Chromium caps this at 2 hours), so most API calls skip OPTIONS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allowed_origins,
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    max_age=7200,
+)
+
+# Content ETags for list endpoints that don't set their own, then compression
+# of everything above 1 KB (the last middleware added runs first)
+app.add_middleware(
+    ETagMiddleware,
+    paths=[f"{settings.API_V1_PREFIX}/{resource}" for resource in ("customers", "products", "invoices")]
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Include routers
 app.include_router(
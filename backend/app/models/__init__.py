@@ -1,6 +1,22 @@
 # Pydantic Models Package
 from .customer import Customer, CustomerCreate, CustomerUpdate, CustomerResponse, CustomerListResponse, CustomerStatus, InsuranceType
+from .product import Product, ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, ProductType
+from .invoice import (
+    Invoice,
+    InvoiceWithItems,
+    InvoiceCreate,
+    InvoiceUpdate,
+    InvoiceResponse,
+    InvoiceListItem,
+    InvoiceListResponse,
+    InvoiceStatus,
+    InvoiceItem,
+    InvoiceItemCreate,
+    InvoiceItemUpdate
+)
 
+# CustomerResponse, ProductResponse and InvoiceResponse are aliases of
+# Customer, Product and InvoiceWithItems
 __all__ = [
     "Customer",
     "CustomerCreate", 
@@ -8,5 +24,22 @@ __all__ = [
     "CustomerResponse",
     "CustomerListResponse",
     "CustomerStatus",
-    "InsuranceType"
+    "InsuranceType",
+    "Product",
+    "ProductCreate",
+    "ProductUpdate",
+    "ProductResponse",
+    "ProductListResponse",
+    "ProductType",
+    "Invoice",
+    "InvoiceWithItems",
+    "InvoiceCreate",
+    "InvoiceUpdate",
+    "InvoiceResponse",
+    "InvoiceListItem",
+    "InvoiceListResponse",
+    "InvoiceStatus",
+    "InvoiceItem",
+    "InvoiceItemCreate",
+    "InvoiceItemUpdate"
 ]
\ No newline at end of file
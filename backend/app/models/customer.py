@@ -1,23 +1,17 @@
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime, date
-from pydantic import BaseModel, EmailStr, Field
-from enum import Enum
+from pydantic import BaseModel, EmailStr, Field, ConfigDict
 
 
-class CustomerStatus(str, Enum):
-    ACTIVE = "aktiv"
-    INACTIVE = "inaktiv"
-    PROSPECT = "interessent"
-    ARCHIVED = "archiviert"
+# Literal types are validated by pydantic-core directly and hold the database values
+CustomerStatus = Literal["aktiv", "inaktiv", "interessent", "archiviert"]
 
-
-class InsuranceType(str, Enum):
-    STATUTORY = "gesetzlich"
-    PRIVATE = "privat"
-    SELF_PAY = "selbstzahler"
+InsuranceType = Literal["gesetzlich", "privat", "selbstzahler"]
 
 
 class CustomerBase(BaseModel):
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=True)
+
     organization_id: int = Field(default=1, description="Organisation ID für Multi-Tenancy")
     first_name: str = Field(..., min_length=1, max_length=100, description="Vorname")
     last_name: str = Field(..., min_length=1, max_length=100, description="Nachname")
@@ -53,7 +47,7 @@ class CustomerBase(BaseModel):
     frame_preferences: Optional[str] = Field(None, max_length=500, description="Fassungsvorlieben")
     contact_preference: Optional[str] = Field(default="email", description="Bevorzugte Kontaktmethode")
     
-    status: CustomerStatus = Field(default=CustomerStatus.PROSPECT, description="Kundenstatus")
+    status: CustomerStatus = Field(default="interessent", description="Kundenstatus")
 
 
 class CustomerCreate(CustomerBase):
@@ -61,6 +55,8 @@ class CustomerCreate(CustomerBase):
 
 
 class CustomerUpdate(BaseModel):
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=True)
+
     organization_id: Optional[int] = None
     first_name: Optional[str] = Field(None, min_length=1, max_length=100)
     last_name: Optional[str] = Field(None, min_length=1, max_length=100)
@@ -101,12 +97,11 @@ class Customer(CustomerBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
-class CustomerResponse(Customer):
-    pass
+# Same schema as Customer; an alias avoids a duplicate model
+CustomerResponse = Customer
 
 
 class CustomerListResponse(BaseModel):
@@ -115,4 +110,5 @@ class CustomerListResponse(BaseModel):
     page: int
     per_page: int
     has_next: bool
-    has_prev: bool
\ No newline at end of file
+    has_prev: bool
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -1,28 +1,24 @@
-from typing import Optional, Dict, Any, List
+from typing import Literal, Optional, Dict, Any, List
 from datetime import datetime, date
-from pydantic import BaseModel, Field
-from enum import Enum
+from pydantic import BaseModel, Field, ConfigDict
 from decimal import Decimal
+from app.models.types import JsonDecimal
 
 
-class InvoiceStatus(str, Enum):
-    DRAFT = "draft"
-    SENT = "sent"
-    PAID = "paid"
-    PARTIALLY_PAID = "partially_paid"
-    INSURANCE_PENDING = "insurance_pending"
-    CANCELLED = "cancelled"
+InvoiceStatus = Literal["draft", "sent", "paid", "partially_paid", "insurance_pending", "cancelled"]
 
 
 class InvoiceItemBase(BaseModel):
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=True)
+
     product_id: Optional[int] = Field(None, description="Produkt-ID (Referenz)")
     product_snapshot: Dict[str, Any] = Field(..., description="Produktdaten zum Zeitpunkt der Rechnung")
     prescription_values: Optional[Dict[str, Any]] = Field(None, description="Rezeptwerte für diesen Artikel")
     quantity: int = Field(default=1, ge=1, description="Menge")
-    unit_price: Decimal = Field(..., ge=0, description="Einzelpreis")
-    discount_amount: Decimal = Field(default=Decimal("0"), ge=0, description="Rabattbetrag")
-    vat_rate: Decimal = Field(..., ge=0, le=1, description="Mehrwertsteuersatz")
-    line_total: Decimal = Field(..., ge=0, description="Zeilensumme")
+    unit_price: JsonDecimal = Field(..., ge=0, description="Einzelpreis")
+    discount_amount: JsonDecimal = Field(default=Decimal("0"), ge=0, description="Rabattbetrag")
+    vat_rate: JsonDecimal = Field(..., ge=0, le=1, description="Mehrwertsteuersatz")
+    line_total: JsonDecimal = Field(..., ge=0, description="Zeilensumme")
     insurance_covered: bool = Field(default=False, description="Von Krankenkasse übernommen")
 
 
@@ -31,14 +27,16 @@ class InvoiceItemCreate(InvoiceItemBase):
 
 
 class InvoiceItemUpdate(BaseModel):
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=True)
+
     product_id: Optional[int] = None
     product_snapshot: Optional[Dict[str, Any]] = None
     prescription_values: Optional[Dict[str, Any]] = None
     quantity: Optional[int] = Field(None, ge=1)
-    unit_price: Optional[Decimal] = Field(None, ge=0)
-    discount_amount: Optional[Decimal] = Field(None, ge=0)
-    vat_rate: Optional[Decimal] = Field(None, ge=0, le=1)
-    line_total: Optional[Decimal] = Field(None, ge=0)
+    unit_price: Optional[JsonDecimal] = Field(None, ge=0)
+    discount_amount: Optional[JsonDecimal] = Field(None, ge=0)
+    vat_rate: Optional[JsonDecimal] = Field(None, ge=0, le=1)
+    line_total: Optional[JsonDecimal] = Field(None, ge=0)
     insurance_covered: Optional[bool] = None
 
 
@@ -47,8 +45,7 @@ class InvoiceItem(InvoiceItemBase):
     invoice_id: int
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class InvoiceCustomer(BaseModel):
@@ -58,6 +55,8 @@ class InvoiceCustomer(BaseModel):
 
 
 class InvoiceBase(BaseModel):
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=True)
+
     organization_id: int = Field(default=1, description="Organisation ID für Multi-Tenancy")
     customer_id: int = Field(..., description="Kunden-ID")
     invoice_date: date = Field(default_factory=date.today, description="Rechnungsdatum")
@@ -65,21 +64,23 @@ class InvoiceBase(BaseModel):
     prescription_snapshot: Optional[Dict[str, Any]] = Field(None, description="Rezeptdaten zum Zeitpunkt der Rechnung")
     insurance_provider: Optional[str] = Field(None, max_length=100, description="Krankenkasse")
     insurance_claim_number: Optional[str] = Field(None, max_length=50, description="Kassenscheinnummer")
-    insurance_coverage_amount: Optional[Decimal] = Field(None, ge=0, description="Kassenleistung")
-    patient_copay_amount: Optional[Decimal] = Field(None, ge=0, description="Eigenanteil Patient")
-    status: InvoiceStatus = Field(default=InvoiceStatus.DRAFT, description="Rechnungsstatus")
+    insurance_coverage_amount: Optional[JsonDecimal] = Field(None, ge=0, description="Kassenleistung")
+    patient_copay_amount: Optional[JsonDecimal] = Field(None, ge=0, description="Eigenanteil Patient")
+    status: InvoiceStatus = Field(default="draft", description="Rechnungsstatus")
     payment_method: Optional[str] = Field(None, max_length=50, description="Zahlungsart")
     notes: Optional[str] = Field(None, max_length=1000, description="Notizen")
 
 
 class InvoiceCreate(InvoiceBase):
-    subtotal: Decimal = Field(..., ge=0, description="Zwischensumme")
-    vat_amount: Decimal = Field(..., ge=0, description="Mehrwertsteuerbetrag")
-    total: Decimal = Field(..., ge=0, description="Gesamtsumme")
+    subtotal: JsonDecimal = Field(..., ge=0, description="Zwischensumme")
+    vat_amount: JsonDecimal = Field(..., ge=0, description="Mehrwertsteuerbetrag")
+    total: JsonDecimal = Field(..., ge=0, description="Gesamtsumme")
     items: Optional[List[InvoiceItemCreate]] = Field(default=[], description="Rechnungspositionen")
 
 
 class InvoiceUpdate(BaseModel):
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=True)
+
     organization_id: Optional[int] = None
     customer_id: Optional[int] = None
     invoice_date: Optional[date] = None
@@ -87,42 +88,60 @@ class InvoiceUpdate(BaseModel):
     prescription_snapshot: Optional[Dict[str, Any]] = None
     insurance_provider: Optional[str] = Field(None, max_length=100)
     insurance_claim_number: Optional[str] = Field(None, max_length=50)
-    insurance_coverage_amount: Optional[Decimal] = Field(None, ge=0)
-    patient_copay_amount: Optional[Decimal] = Field(None, ge=0)
+    insurance_coverage_amount: Optional[JsonDecimal] = Field(None, ge=0)
+    patient_copay_amount: Optional[JsonDecimal] = Field(None, ge=0)
     status: Optional[InvoiceStatus] = None
     payment_method: Optional[str] = Field(None, max_length=50)
     notes: Optional[str] = Field(None, max_length=1000)
-    subtotal: Optional[Decimal] = Field(None, ge=0)
-    vat_amount: Optional[Decimal] = Field(None, ge=0)
-    total: Optional[Decimal] = Field(None, ge=0)
+    subtotal: Optional[JsonDecimal] = Field(None, ge=0)
+    vat_amount: Optional[JsonDecimal] = Field(None, ge=0)
+    total: Optional[JsonDecimal] = Field(None, ge=0)
 
 
 class Invoice(InvoiceBase):
     id: int
     invoice_number: str
-    subtotal: Decimal
-    vat_amount: Decimal
-    total: Decimal
+    subtotal: JsonDecimal
+    vat_amount: JsonDecimal
+    total: JsonDecimal
     created_at: datetime
     updated_at: datetime
     customer: Optional[InvoiceCustomer] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class InvoiceWithItems(Invoice):
     items: List[InvoiceItem] = Field(default=[], description="Rechnungspositionen")
 
 
-class InvoiceResponse(InvoiceWithItems):
-    pass
+# Same schema as InvoiceWithItems; an alias avoids a duplicate model
+InvoiceResponse = InvoiceWithItems
+
+
+class InvoiceListItem(BaseModel):
+    """Invoice row as returned by the list endpoint without items"""
+    id: int
+    organization_id: int
+    customer_id: int
+    invoice_number: str
+    invoice_date: date
+    due_date: Optional[date] = None
+    subtotal: JsonDecimal
+    vat_amount: JsonDecimal
+    total: JsonDecimal
+    status: InvoiceStatus
+    created_at: datetime
+    updated_at: datetime
+    customer: Optional[InvoiceCustomer] = None
+    prescription_snapshot: Optional[Dict[str, Any]] = Field(None, description="Only with include_prescription_snapshot")
 
 
 class InvoiceListResponse(BaseModel):
-    invoices: List[Invoice | InvoiceWithItems]
+    invoices: List[InvoiceListItem | InvoiceWithItems]
     total: int
     page: int
     per_page: int
     has_next: bool
-    has_prev: bool
\ No newline at end of file
+    has_prev: bool
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -1,18 +1,16 @@
-from typing import Optional, Dict, Any
+from typing import Literal, Optional, Dict, Any
 from datetime import datetime
-from pydantic import BaseModel, Field
-from enum import Enum
+from pydantic import BaseModel, Field, ConfigDict
 from decimal import Decimal
+from app.models.types import JsonDecimal
 
 
-class ProductType(str, Enum):
-    FRAME = "frame"
-    LENS = "lens"
-    CONTACT_LENS = "contact_lens"
-    ACCESSORY = "accessory"
+ProductType = Literal["frame", "lens", "contact_lens", "accessory"]
 
 
 class ProductBase(BaseModel):
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=True)
+
     organization_id: int = Field(default=1, description="Organisation ID für Multi-Tenancy")
     product_type: ProductType = Field(..., description="Produkttyp")
     sku: Optional[str] = Field(None, max_length=50, description="Artikelnummer")
@@ -24,8 +22,8 @@ class ProductBase(BaseModel):
     lens_material: Optional[str] = Field(None, max_length=100, description="Glasmaterial")
     lens_coating: Optional[Dict[str, Any]] = Field(None, description="Glasbeschichtungen als JSON")
     details: Optional[Dict[str, Any]] = Field(None, description="Weitere Details als JSON")
-    current_price: Decimal = Field(..., ge=0, description="Aktueller Preis")
-    vat_rate: Decimal = Field(default=Decimal("0.19"), ge=0, le=1, description="Mehrwertsteuersatz")
+    current_price: JsonDecimal = Field(..., ge=0, description="Aktueller Preis")
+    vat_rate: JsonDecimal = Field(default=Decimal("0.19"), ge=0, le=1, description="Mehrwertsteuersatz")
     insurance_eligible: bool = Field(default=False, description="Kassenfähig")
     active: bool = Field(default=True, description="Aktiv")
 
@@ -35,6 +33,8 @@ class ProductCreate(ProductBase):
 
 
 class ProductUpdate(BaseModel):
+    model_config = ConfigDict(extra='ignore', str_strip_whitespace=True)
+
     organization_id: Optional[int] = None
     product_type: Optional[ProductType] = None
     sku: Optional[str] = Field(None, max_length=50)
@@ -46,8 +46,8 @@ class ProductUpdate(BaseModel):
     lens_material: Optional[str] = Field(None, max_length=100)
     lens_coating: Optional[Dict[str, Any]] = None
     details: Optional[Dict[str, Any]] = None
-    current_price: Optional[Decimal] = Field(None, ge=0)
-    vat_rate: Optional[Decimal] = Field(None, ge=0, le=1)
+    current_price: Optional[JsonDecimal] = Field(None, ge=0)
+    vat_rate: Optional[JsonDecimal] = Field(None, ge=0, le=1)
     insurance_eligible: Optional[bool] = None
     active: Optional[bool] = None
 
@@ -57,12 +57,11 @@ class Product(ProductBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
-class ProductResponse(Product):
-    pass
+# Same schema as Product; an alias avoids a duplicate model
+ProductResponse = Product
 
 
 class ProductListResponse(BaseModel):
@@ -71,4 +70,5 @@ class ProductListResponse(BaseModel):
     page: int
     per_page: int
     has_next: bool
-    has_prev: bool
\ No newline at end of file
+    has_prev: bool
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,7 @@
+from decimal import Decimal
+from typing import Annotated
+from pydantic import PlainSerializer
+
+# Amounts and rates are validated as Decimal but written to JSON as numbers,
+# matching what PostgREST returns for numeric columns and the frontend types
+JsonDecimal = Annotated[Decimal, PlainSerializer(float, return_type=float, when_used='json')]
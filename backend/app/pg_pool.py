@@ -0,0 +1,62 @@
+import asyncio
+from typing import Optional
+import asyncpg
+import orjson
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Exchange json/jsonb columns as Python objects"""
+    for type_name in ('json', 'jsonb'):
+        await conn.set_type_codec(
+            type_name,
+            encoder=lambda value: orjson.dumps(value).decode(),
+            decoder=orjson.loads,
+            schema='pg_catalog'
+        )
+
+
+async def get_pg_pool() -> Optional[asyncpg.Pool]:
+    """Return the direct Postgres pool, or None if SUPAVISOR_URL is not configured"""
+    global _pool
+    if _pool is None and settings.SUPAVISOR_URL:
+        async with _pool_lock:
+            if _pool is None:
+                # Supavisor in transaction mode can't keep prepared statements
+                # across transactions, so asyncpg's statement cache is disabled
+                _pool = await asyncpg.create_pool(
+                    dsn=settings.SUPAVISOR_URL,
+                    min_size=1,
+                    max_size=settings.SUPAVISOR_POOL_SIZE,
+                    statement_cache_size=0,
+                    init=_init_connection
+                )
+                logger.info("Postgres pool initialized")
+    return _pool
+
+
+def pg_pool_stats() -> Optional[dict]:
+    """Connection counts of the direct Postgres pool, or None if it isn't open"""
+    if _pool is None:
+        return None
+    return {
+        "size": _pool.get_size(),
+        "idle": _pool.get_idle_size(),
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size()
+    }
+
+
+async def close_pg_pool() -> None:
+    """Close the direct Postgres pool if it was opened"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        logger.info("Postgres pool closed")
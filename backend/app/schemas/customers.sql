@@ -3,6 +3,7 @@
 
 -- Enable necessary extensions
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Customer status enum
 CREATE TYPE customer_status AS ENUM ('aktiv', 'inaktiv', 'interessent', 'archiviert');
@@ -65,7 +66,19 @@ CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email);
 CREATE INDEX IF NOT EXISTS idx_customers_status ON customers(status);
 CREATE INDEX IF NOT EXISTS idx_customers_next_appointment ON customers(next_appointment);
 CREATE INDEX IF NOT EXISTS idx_customers_created_at ON customers(created_at);
-CREATE INDEX IF NOT EXISTS idx_customers_search ON customers USING gin(to_tsvector('german', first_name || ' ' || last_name || ' ' || COALESCE(email, '')));
+
+-- Trigram indexes backing the substring (ILIKE '%term%') search in the customer list
+CREATE INDEX IF NOT EXISTS idx_customers_first_name_trgm ON customers USING gin(first_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_customers_last_name_trgm ON customers USING gin(last_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_customers_email_trgm ON customers USING gin(email gin_trgm_ops);
+
+-- Composite indexes matching the customer list filter + sort combinations
+CREATE INDEX IF NOT EXISTS idx_customers_status_created_at ON customers(status, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_customers_status_last_name ON customers(status, last_name);
+CREATE INDEX IF NOT EXISTS idx_customers_status_first_name ON customers(status, first_name);
+CREATE INDEX IF NOT EXISTS idx_customers_status_last_exam_date ON customers(status, last_exam_date);
+CREATE INDEX IF NOT EXISTS idx_customers_status_next_appointment ON customers(status, next_appointment);
+CREATE INDEX IF NOT EXISTS idx_customers_insurance_type_created_at ON customers(insurance_type, created_at DESC);
 
 -- Function to automatically update the updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -82,6 +95,114 @@ CREATE TRIGGER update_customers_updated_at
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Paginated customer list used by GET /customers (called via PostgREST RPC).
+-- Applies filters, sorting, offset or keyset pagination and the total count
+-- in a single statement. p_cursor is the [sort_value, id] pair of the last
+-- row of the previous page. p_count works like PostgREST's count option:
+-- 'exact' counts rows, 'planned' uses the planner estimate and 'estimated'
+-- uses the estimate only when it exceeds 1000 rows and counts exactly below.
+-- Callers request one row more than the page size to learn whether a next
+-- page exists.
+DROP FUNCTION IF EXISTS list_customers(TEXT, TEXT, TEXT, TEXT, BOOLEAN, INTEGER, INTEGER, JSONB, BOOLEAN);
+CREATE OR REPLACE FUNCTION list_customers(
+    p_search TEXT DEFAULT NULL,
+    p_status TEXT DEFAULT NULL,
+    p_insurance_type TEXT DEFAULT NULL,
+    p_sort_by TEXT DEFAULT 'created_at',
+    p_desc BOOLEAN DEFAULT TRUE,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0,
+    p_cursor JSONB DEFAULT NULL,
+    p_count TEXT DEFAULT 'estimated'
+)
+RETURNS TABLE (data JSONB, total BIGINT)
+-- VOLATILE because EXPLAIN is not allowed in STABLE or IMMUTABLE functions
+LANGUAGE plpgsql VOLATILE AS $$
+DECLARE
+    v_filter TEXT := 'TRUE';
+    v_page_filter TEXT;
+    v_direction TEXT := CASE WHEN p_desc THEN 'DESC' ELSE 'ASC' END;
+    v_plan JSON;
+BEGIN
+    IF p_sort_by NOT IN ('created_at', 'last_name', 'first_name', 'last_exam_date', 'next_appointment') THEN
+        RAISE EXCEPTION 'Invalid sort field: %', p_sort_by;
+    END IF;
+
+    IF p_search IS NOT NULL AND p_search <> '' THEN
+        v_filter := v_filter || format(
+            ' AND (first_name ILIKE %1$L OR last_name ILIKE %1$L OR email ILIKE %1$L)',
+            '%' || p_search || '%'
+        );
+    END IF;
+    IF p_status IS NOT NULL THEN
+        v_filter := v_filter || format(' AND status = %L', p_status);
+    END IF;
+    IF p_insurance_type IS NOT NULL THEN
+        v_filter := v_filter || format(' AND insurance_type = %L', p_insurance_type);
+    END IF;
+
+    -- Total count
+    IF p_count <> 'exact' THEN
+        EXECUTE format('EXPLAIN (FORMAT JSON) SELECT 1 FROM customers WHERE %s', v_filter) INTO v_plan;
+        total := (v_plan -> 0 -> 'Plan' ->> 'Plan Rows')::BIGINT;
+    END IF;
+    -- Planner guesses are far off for small or unanalyzed tables, so
+    -- estimated counts them exactly
+    IF p_count = 'exact' OR (p_count = 'estimated' AND total < 1000) THEN
+        EXECUTE format('SELECT count(*) FROM customers WHERE %s', v_filter) INTO total;
+    END IF;
+
+    -- Page of rows, continuing after the cursor instead of using OFFSET when given
+    v_page_filter := v_filter;
+    -- NULL sort values come last ascending and first descending (the PostgreSQL
+    -- default), so last_exam_date and next_appointment cursors may sit on a NULL
+    IF p_cursor IS NOT NULL AND p_cursor ->> 0 IS NULL THEN
+        v_page_filter := v_page_filter || format(
+            CASE WHEN p_desc
+                THEN ' AND (%1$I IS NOT NULL OR id < %2$s)'
+                ELSE ' AND %1$I IS NULL AND id > %2$s'
+            END,
+            p_sort_by,
+            (p_cursor ->> 1)::BIGINT
+        );
+        p_offset := 0;
+    ELSIF p_cursor IS NOT NULL THEN
+        v_page_filter := v_page_filter || format(
+            ' AND ((%1$I, id) %2$s (%3$L, %4$s)%5$s)',
+            p_sort_by,
+            CASE WHEN p_desc THEN '<' ELSE '>' END,
+            p_cursor ->> 0,
+            (p_cursor ->> 1)::BIGINT,
+            CASE WHEN NOT p_desc AND p_sort_by IN ('last_exam_date', 'next_appointment')
+                THEN format(' OR %I IS NULL', p_sort_by)
+                ELSE ''
+            END
+        );
+        p_offset := 0;
+    END IF;
+
+    EXECUTE format(
+        'SELECT COALESCE(jsonb_agg(to_jsonb(c) ORDER BY c.%1$I %2$s, c.id %2$s), ''[]''::jsonb)
+         FROM (
+             SELECT id, organization_id, first_name, last_name, email, phone, mobile,
+                    date_of_birth, address_street, address_city, address_postal_code,
+                    address_country, insurance_provider, insurance_type, insurance_number,
+                    last_exam_date, next_appointment, prescription_sphere_right,
+                    prescription_sphere_left, prescription_cylinder_right,
+                    prescription_cylinder_left, prescription_axis_right, prescription_axis_left,
+                    prescription_addition, prescription_pd, allergies, medical_notes,
+                    frame_preferences, contact_preference, status, created_at, updated_at
+             FROM customers WHERE %3$s
+             ORDER BY %1$I %2$s, id %2$s
+             LIMIT %4$s OFFSET %5$s
+         ) c',
+        p_sort_by, v_direction, v_page_filter, p_limit, p_offset
+    ) INTO data;
+
+    RETURN NEXT;
+END;
+$$;
+
 -- Row Level Security (RLS) policies
 ALTER TABLE customers ENABLE ROW LEVEL SECURITY;
 
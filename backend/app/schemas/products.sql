@@ -1,6 +1,9 @@
 -- Visual CRM - Products Schema
 -- PostgreSQL/Supabase table definitions for optician product management
 
+-- Enable trigram matching for the product search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Product type enum
 CREATE TYPE product_type AS ENUM ('frame', 'lens', 'contact_lens', 'accessory');
 
@@ -46,7 +49,12 @@ CREATE INDEX IF NOT EXISTS idx_products_organization_id ON products(organization
 CREATE INDEX IF NOT EXISTS idx_products_type ON products(product_type);
 CREATE INDEX IF NOT EXISTS idx_products_sku ON products(sku);
 CREATE INDEX IF NOT EXISTS idx_products_active ON products(active) WHERE (active = true);
-CREATE INDEX IF NOT EXISTS idx_products_search ON products USING gin(to_tsvector('german', name || ' ' || COALESCE(brand, '') || ' ' || COALESCE(model, '')));
+
+-- Trigram indexes backing the substring (ILIKE '%term%') search in the product list
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING gin(name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_brand_trgm ON products USING gin(brand gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_model_trgm ON products USING gin(model gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_sku_trgm ON products USING gin(sku gin_trgm_ops);
 
 -- Trigger to automatically update updated_at on row changes
 CREATE TRIGGER update_products_updated_at 